@@ -7,6 +7,13 @@ from typing import Optional
 class Settings(BaseSettings):
     PROJECT_NAME: str = "FastAPI MongoDB Project"
     MONGODB_URL: str # Changed from MongoDsn
+    # Motor connection pool; connections are opened up front and reused for the process lifetime
+    # MONGO_MAX_POOL_SIZE is the budget for the whole deployment and is split across WEB_CONCURRENCY workers
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 10
+    MONGO_MAX_IDLE_TIME_MS: int = 30000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000
+    WEB_CONCURRENCY: int = 1 # Worker process count, same variable uvicorn/gunicorn read
 
     # Optional: Define other settings your app might need
     # API_V1_STR: str = "/api/v1"
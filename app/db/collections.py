@@ -0,0 +1,50 @@
+import motor.motor_asyncio
+from bson import ObjectId
+from cachetools import TTLCache
+from typing import Optional
+from .mongodb import db
+from ..utils.responses import document_etag
+
+# Collection handles are cheap but identical for the life of the client, so resolve each once
+_collections: dict[str, motor.motor_asyncio.AsyncIOMotorCollection] = {}
+
+def get_collection(name: str) -> motor.motor_asyncio.AsyncIOMotorCollection:
+    """Returns the cached handle for a collection, creating it on first use."""
+    collection = _collections.get(name)
+    if collection is None:
+        if db.db is None:
+            raise Exception("Database not initialized. Call connect_to_mongo first.")
+        collection = _collections[name] = db.db.get_collection(name)
+    return collection
+
+# (collection, _id) pairs a delete just missed. Ids are generated server-side, so a miss
+# stays a miss; retry bursts are answered from here for a few seconds instead of by Mongo.
+_missing_ids: TTLCache = TTLCache(maxsize=4096, ttl=5)
+
+async def delete_by_id(name: str, oid: ObjectId, comment: str) -> bool:
+    """Deletes one document by _id. Returns False when there was nothing to delete."""
+    key = (name, oid)
+    if key in _missing_ids:
+        return False
+    # comment tags the operation in currentOp and the profiler
+    delete_result = await get_collection(name).delete_one({"_id": oid}, comment=comment)
+    if delete_result.deleted_count == 0:
+        _missing_ids[key] = True
+        return False
+    return True
+
+# Merged into every update on collections whose by-id GETs carry an ETag, so the tag
+# moves whenever the document does
+TOUCH_UPDATED_AT = {"$currentDate": {"updated_at": True}}
+
+async def current_etag(name: str, oid: ObjectId) -> Optional[str]:
+    """ETag of the stored document, read with an updated_at-only projection; None if it doesn't exist."""
+    doc = await get_collection(name).find_one({"_id": oid}, {"updated_at": 1})
+    if doc is None:
+        return None
+    return document_etag(oid, doc.get("updated_at"))
+
+def clear_collections():
+    """Drops cached handles; called when the client is closed so a reconnect starts fresh."""
+    _collections.clear()
+    _missing_ids.clear()
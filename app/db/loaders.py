@@ -0,0 +1,69 @@
+import asyncio
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import Request
+from .collections import get_collection
+
+class BatchLoader:
+    """
+    Coalesces by-id lookups on one collection. Every load() issued before the event loop
+    gets back to the loader is answered by a single find({"_id": {"$in": [...]}}),
+    returning only the `projection` fields when one is given.
+    """
+
+    def __init__(self, collection_name: str, projection: Optional[dict] = None):
+        self.collection_name = collection_name
+        self.projection = projection
+        self._pending: dict[ObjectId, list[asyncio.Future]] = {}
+        self._scheduled = False
+        self._tasks: set[asyncio.Task] = set() # The loop only keeps weak references to tasks
+
+    async def load(self, oid: ObjectId) -> Optional[dict]:
+        """Returns the document with this _id, or None if there is none."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(oid, []).append(future)
+        if not self._scheduled:
+            # Runs on a later loop iteration, after the other ready handlers have queued their ids
+            self._scheduled = True
+            task = loop.create_task(self._dispatch())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return await future
+
+    async def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        try:
+            cursor = get_collection(self.collection_name).find({"_id": {"$in": list(pending)}}, self.projection)
+            docs = await cursor.to_list(length=None)
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        by_id = {doc["_id"]: doc for doc in docs}
+        for oid, futures in pending.items():
+            doc = by_id.get(oid)
+            for future in futures:
+                if not future.done():
+                    # Each caller gets its own copy so one handler can't change another's result
+                    future.set_result(dict(doc) if doc is not None else None)
+
+def loader_dependency(name: str, projection: Optional[dict] = None):
+    """
+    FastAPI dependency giving each request its own loader for a collection, kept on
+    request.state so nothing (futures, tasks) outlives the request or crosses event loops.
+    """
+    def get_loader(request: Request) -> BatchLoader:
+        loaders = getattr(request.state, "loaders", None)
+        if loaders is None:
+            loaders = request.state.loaders = {}
+        loader = loaders.get(name)
+        if loader is None:
+            loader = loaders[name] = BatchLoader(name, projection)
+        return loader
+    return get_loader
@@ -19,8 +19,15 @@ async def connect_to_mongo():
     print(f"Attempting to connect to MongoDB...")
     try:
         connection_string = str(settings.MONGODB_URL)
+        # Each worker process has its own client, so give each its share of the pool budget
+        max_pool_size = max(1, settings.MONGO_MAX_POOL_SIZE // max(1, settings.WEB_CONCURRENCY))
         db.client = motor.motor_asyncio.AsyncIOMotorClient(
             connection_string,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min(settings.MONGO_MIN_POOL_SIZE, max_pool_size),
+            maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+            # Fail fast with an error instead of queueing forever when the pool is exhausted
+            waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
             # Optional: Add server selection timeout if needed
             # serverSelectionTimeoutMS=5000
         )
@@ -36,10 +43,34 @@ async def connect_to_mongo():
         print(f"Pinging MongoDB server...")
         await db.client.admin.command('ping')
         print(f"Successfully connected to MongoDB database: {db_name}")
+        await ensure_indexes(db.db)
     except Exception as e:
         print(f"Error connecting to MongoDB: {e}")
         raise
 
+# (collection, keys, options) created at startup; create_index is a no-op when the index exists
+INDEXES = [
+    ("agent_users", "email", {"unique": True}),
+    ("agent_users", "uid", {"unique": True}),
+    # History lookups: equality on uid, then sort/range on message_datetime (ESR order)
+    ("messages", [("uid", 1), ("message_datetime", -1)], {}),
+    # /by_status/ and /by_message/ lookups
+    ("messages", "status", {}),
+    ("github_tasks", "status", {}),
+    ("jira_tasks", "status", {}),
+    # by_message: equality on mid, returned in _id order straight off the index
+    ("github_tasks", [("mid", 1), ("_id", 1)], {}),
+    ("jira_tasks", [("mid", 1), ("_id", 1)], {}),
+]
+
+async def ensure_indexes(database: motor.motor_asyncio.AsyncIOMotorDatabase):
+    """Creates the indexes the hot lookups rely on. Failures are logged, not fatal."""
+    for collection_name, keys, options in INDEXES:
+        try:
+            await database[collection_name].create_index(keys, **options)
+        except Exception as e:
+            print(f"Could not create index {keys} on {collection_name}: {e}")
+
 async def close_mongo_connection():
     """Closes the MongoDB connection."""
     if db.client:
@@ -47,6 +78,9 @@ async def close_mongo_connection():
         db.client.close()
         db.client = None
         db.db = None
+        # Imported here because collections imports this module
+        from .collections import clear_collections
+        clear_collections()
         print("MongoDB connection closed.")
 
 # --- Example Usage in Routers/Services ---
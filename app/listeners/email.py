@@ -258,7 +258,7 @@ def merge_meetings(email_meetings, calendar_events):
 
 def get_groq_api_key(sender_email):
     try:
-        response = requests.get(f"{BASE_API_URL}/api/v1/agent_users/groq/{sender_email}", timeout=10)
+        response = requests.get(f"{BASE_API_URL}/api/v1/agent_users/by-email/{sender_email}/groq", timeout=10)
 
         if response.status_code == 200:
             data = response.json()
@@ -510,7 +510,7 @@ def poll_inbox_task():
             
             if sender_email:
                 try:
-                    response = requests.get(f"{BASE_API_URL}/api/v1/agent_users/{sender_email}", timeout=10)
+                    response = requests.get(f"{BASE_API_URL}/api/v1/agent_users/by-email/{sender_email}", timeout=10)
 
                     if response.status_code == 200:
                         uid = response.json()["id"]
@@ -283,7 +283,7 @@ class TaskProcessor:
             logger.info(f"Updating task {task_id} with status: {status}")
 
             # Send update request
-            update_response = requests.put(endpoint, json=current_task)
+            update_response = requests.put(endpoint, json=current_task, headers={"Prefer": "return=minimal"})
             update_response.raise_for_status()
 
             logger.info(f"Successfully updated {task_type} task {task_id} status to {status}")
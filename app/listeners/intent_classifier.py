@@ -145,9 +145,9 @@ def update_message_type(mid, message_type, original_message):
         }
 
         logger.info(f"Updating message {mid} with payload: {payload}")
-        response = requests.put(f"{BASE_API_URL}/api/v1/messages/{mid}", json=payload)
+        response = requests.put(f"{BASE_API_URL}/api/v1/messages/{mid}", json=payload, headers={"Prefer": "return=minimal"})
 
-        if response.status_code == 200:
+        if response.status_code in (200, 204):
             logger.info(f"Successfully updated message {mid}")
             return True
         else:
@@ -1,12 +1,23 @@
 import os
+import uuid
 import time
+from datetime import datetime, timedelta, timezone
 import requests
+import httpx
+import orjson
+from collections import Counter
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import redis
 from dotenv import load_dotenv
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
-from datetime import datetime, timezone
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+from email.utils import parsedate_to_datetime
 from app.celery_app import celery_app  # Import Celery app
+from app.utils.rate_limit import slack_post_limiter
 
 # Load environment variables
 load_dotenv()
@@ -25,33 +36,123 @@ except Exception as e:
     print(f"❌ Failed to connect to Redis: {e}")
     REDIS_AVAILABLE = False
 
-client = WebClient(token=SLACK_BOT_TOKEN)
-BASE_API_URL = os.getenv("BASE_API_URL")
+# One client for every pool thread (chat_postMessage is thread-safe). Short 429s are
+# retried in place; anything the handler gives up on becomes a deferred Celery retry.
+client = WebClient(token=SLACK_BOT_TOKEN, timeout=10)
+client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=3))
 TENANT_ID     = os.getenv("TENANT_ID")
 CLIENT_ID     = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 USER_EMAIL    = os.getenv("USER_EMAIL")
 GRAPH_API = "https://graph.microsoft.com/v1.0"
 AUTH_URL  = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
+_REPLY_URL_TMPL = f"{GRAPH_API}/users/{USER_EMAIL}/messages/{{message_id}}/reply"
 LOCK_EXPIRE_TIME = 300  # seconds (5 minutes)
+REPLY_WORKERS = 8  # concurrent replies per task run
+# Only what _process_one reads; the API projects everything else away
+REPLY_FIELDS = "msg_id,channel,channel_id,thread_ts,reply"
+CLAIM_BATCH_SIZE = 50  # messages claimed per /claim call while the listing streams
+TOKEN_CACHE_KEY = "token:graph"
+TOKEN_LOCK_KEY = "token:graph:lock"
+
+# In-process copy of the shared token; expiry is a time.monotonic() deadline
+_graph_token = None
+_graph_token_expiry = 0.0
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# ─── HTTP SESSION ──────────────────────────────────────────────────────────────
+# Keep-alive pool for the internal API calls. urllib3 only retries idempotent
+# methods, so claim POSTs are never sent twice.
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+# Graph speaks HTTP/2, so the pool threads' token and reply POSTs share a few
+# multiplexed connections instead of one TLS connection each. httpx.Client is thread-safe.
+_graph_http = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+    timeout=15
+)
 
 # ─── ACCESS TOKEN ──────────────────────────────────────────────────────────────
 
-def get_access_token():
+def _fetch_access_token():
+    """Request a new Graph token. Returns (token, expires_in) or (None, 0)."""
     token_data = {
         "client_id": CLIENT_ID,
         "client_secret": CLIENT_SECRET,
         "scope": "https://graph.microsoft.com/.default",
         "grant_type": "client_credentials"
     }
-    response = requests.post(AUTH_URL, data=token_data)
-    token_json = response.json()
+    response = _graph_http.post(AUTH_URL, data=token_data)
+    token_json = orjson.loads(response.content)
     if "access_token" in token_json:
         print("✅ Access Token Fetched")
-        return token_json["access_token"]
+        return token_json["access_token"], int(token_json.get("expires_in", 3600))
     else:
         print("❌ Error fetching token:", token_json)
-        return None
+        return None, 0
+
+def _cached_shared_token():
+    """Return (token, seconds_left) from Redis, or (None, 0) on a miss."""
+    token, ttl = redis_client.pipeline().get(TOKEN_CACHE_KEY).ttl(TOKEN_CACHE_KEY).execute()
+    return (token.decode(), ttl) if token and ttl > 0 else (None, 0)
+
+def _shared_access_token():
+    """
+    Return (token, seconds_left) for a Graph token shared by all workers through
+    Redis. Only the worker holding TOKEN_LOCK_KEY hits the token endpoint; the
+    others wait for its result.
+    """
+    if not REDIS_AVAILABLE:
+        token, expires_in = _fetch_access_token()
+        return token, expires_in - 60
+
+    try:
+        token, ttl = _cached_shared_token()
+        if token:
+            return token, ttl
+
+        if not redis_client.set(TOKEN_LOCK_KEY, os.environ.get("HOSTNAME", "unknown"), ex=10, nx=True):
+            # Another worker is refreshing; give it a moment before fetching ourselves
+            for _ in range(20):
+                time.sleep(0.25)
+                token, ttl = _cached_shared_token()
+                if token:
+                    return token, ttl
+            token, expires_in = _fetch_access_token()
+            return token, expires_in - 60
+
+        try:
+            token, expires_in = _fetch_access_token()
+            if token:
+                # Expire a minute early so nobody is handed a token about to lapse
+                redis_client.setex(TOKEN_CACHE_KEY, max(expires_in - 60, 1), token)
+            return token, expires_in - 60
+        finally:
+            redis_client.delete(TOKEN_LOCK_KEY)
+    except redis.RedisError as e:
+        print(f"⚠️ Redis token cache unavailable, fetching directly: {e}")
+        token, expires_in = _fetch_access_token()
+        return token, expires_in - 60
+
+def get_access_token():
+    """Return a valid Graph token, checking the in-process copy before Redis."""
+    global _graph_token, _graph_token_expiry
+    if _graph_token and time.monotonic() < _graph_token_expiry:
+        return _graph_token
+
+    token, seconds_left = _shared_access_token()
+    if token:
+        _graph_token, _graph_token_expiry = token, time.monotonic() + seconds_left
+    return token
 
 # ─── LOCK FUNCTIONS ─────────────────────────────────────────────────────────────
 
@@ -91,12 +192,31 @@ def release_lock(mid):
 
 # ─── SEND REPLY ────────────────────────────────────────────────────────────────
 
-def reply_to_email(message_id, response_body):
-    access_token = get_access_token()
+class ReplyThrottled(Exception):
+    """Graph or Slack asked us to back off; retry_after is in seconds."""
+    def __init__(self, retry_after):
+        super().__init__(f"throttled for {retry_after}s")
+        self.retry_after = retry_after
+
+def _retry_after_seconds(value, default=30):
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return default
+    try:
+        return max(int(value), 1)
+    except ValueError:
+        pass
+    try:
+        return max(int(parsedate_to_datetime(value).timestamp() - time.time()), 1)
+    except (TypeError, ValueError):
+        return default
+
+def reply_to_email(message_id, response_body, token=None):
+    access_token = token or get_access_token()
     if not access_token:
         return False
 
-    url = f"{GRAPH_API}/users/{USER_EMAIL}/messages/{message_id}/reply"
+    url = _REPLY_URL_TMPL.format(message_id=message_id)
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
@@ -104,16 +224,19 @@ def reply_to_email(message_id, response_body):
     data = {
         "comment": response_body
     }
-    resp = requests.post(url, headers=headers, json=data)
+    resp = _graph_http.post(url, headers=headers, content=orjson.dumps(data))
     if resp.status_code == 202:
         print(f"📧 Replied to message {message_id}")
         return True
+    elif resp.status_code in (429, 503):
+        raise ReplyThrottled(_retry_after_seconds(resp.headers.get("Retry-After")))
     else:
         print(f"❌ Failed to reply to {message_id}: {resp.status_code} | {resp.text}")
         return False
 
 def send_slack_reply(channel_id, message_text, thread_ts=None):
     try:
+        slack_post_limiter.acquire(channel_id)
         response = client.chat_postMessage(
             channel=channel_id,
             text=message_text,
@@ -122,46 +245,65 @@ def send_slack_reply(channel_id, message_text, thread_ts=None):
         print(f"✅ Reply sent to Slack | channel: {channel_id} | thread_ts: {response['ts']}")
         return response
     except SlackApiError as e:
+        if e.response.status_code == 429:
+            raise ReplyThrottled(_retry_after_seconds(e.response.headers.get("Retry-After")))
         print(f"❌ Slack API Error: {e.response['error']}")
         return None
 
-def get_processed_message_ids():
+def iter_claimable_messages():
+    """
+    Yield claimable messages (processed, deferred and due, or stranded in 'sending' by a
+    run whose claim lease expired) with their reply fields as they stream in, so replies can start before
+    the whole listing has downloaded; each entry is the full record for this task.
+    """
     try:
-        url = f"{BASE_API_URL}/api/v1/messages/by_status/?status=processed"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        url = f"{BASE_API_URL}/api/v1/messages/claimable/"
+        params = {"fields": REPLY_FIELDS}
+        with _session.get(url, params=params, headers={"Accept": "application/x-ndjson"}, stream=True) as response:
+            response.raise_for_status()
+            if "application/x-ndjson" not in response.headers.get("Content-Type", ""):
+                # Older API without streaming: plain JSON array
+                yield from orjson.loads(response.content)
+                return
+            for line in response.iter_lines():
+                if line:
+                    yield orjson.loads(line)
     except Exception as e:
-        print(f"❌ Failed to fetch message IDs: {e}")
-        return []
+        print(f"❌ Failed to fetch processed messages: {e}")
 
-def get_message_by_mid(mid):
+def _batches(iterable, size):
+    """Split an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def claim_messages(mids, claim_id):
+    """Claim messages for this run; returns the subset no other run already holds."""
+    if not mids:
+        return []
     try:
-        url = f"{BASE_API_URL}/api/v1/messages/{mid}"
-        response = requests.get(url)
+        url = f"{BASE_API_URL}/api/v1/messages/claim"
+        response = _session.post(url, data=orjson.dumps({"mids": mids, "claim_id": claim_id}), headers=_JSON_HEADERS)
         response.raise_for_status()
-        return response.json()
+        return [entry["mid"] for entry in orjson.loads(response.content)]
     except Exception as e:
-        print(f"❌ Failed to fetch message {mid}: {e}")
-        return None
+        print(f"❌ Failed to claim messages: {e}")
+        return []
 
-def update_status(mid, original_message):
-    """Update the message status to successful in DB"""
+def update_status(mid, status="successful", claim_id=None, retry_at=None):
+    """Update the message status in DB (successful by default); with claim_id, only while that claim holds it"""
     try:
-        # Get the current message data to ensure we have all fields
+        # Only the changed fields go over the wire; the server applies them with $set
         url = f"{BASE_API_URL}/api/v1/messages/{mid}"
-        get_response = requests.get(url)
-        get_response.raise_for_status()
-        message_data = get_response.json()
-        
-        # Just update the status field
-        message_data["status"] = "successful"
-        
-        # Send the update
-        response = requests.put(url, json=message_data)
+        body = {"status": status, "processed": True}
+        if claim_id:
+            body["claim_id"] = claim_id
+        if retry_at:
+            body["retry_at"] = retry_at
+        response = _session.patch(url, data=orjson.dumps(body), headers=_JSON_HEADERS, timeout=10)
 
         if response.status_code == 200:
-            print(f"✅ Successfully updated message {mid} to successful")
+            print(f"✅ Successfully updated message {mid} to {status}")
             return True
         else:
             print(f"❌ Failed to update message {mid}: {response.status_code} {response.text}")
@@ -170,63 +312,144 @@ def update_status(mid, original_message):
         print(f"❌ Exception while updating message {mid}: {e}")
         return False
 
-@celery_app.task(name='app.listeners.reply.send_pending_replies_task')
-def send_pending_replies_task():
-    """Celery task to process messages and send replies"""
-    mids = get_processed_message_ids()
-    print(f"🔍 Found {len(mids)} processed messages")
-    
-    sent_count = 0
-    for entry in mids:
-        mid = entry.get("mid")
-        if not mid:
-            continue
-
-        # Try to acquire a lock for this message
-        if not acquire_lock(mid):
-            print(f"⏭️ Skipping message {mid} - already being processed by another worker")
-            continue
-            
-        try:
-            message = get_message_by_mid(mid)
-            if not message:
-                continue
-
-            channel = message.get("channel", "").lower()
-            reply = message.get("reply")
-
-            if not reply:
-                print(f"⚠️ Skipping message {mid} — no reply content")
-                continue
-
-            success = False
-
-            if channel == "email" and message.get("msg_id"):
-                success = reply_to_email(
-                    message_id=message["msg_id"],
-                    response_body=message["reply"]
-                )
-
-            elif channel == "slack" and message.get("channel_id") and message.get("thread_ts"):
-                success = send_slack_reply(
-                    channel_id=message["channel_id"],
-                    message_text=message["reply"],
-                    thread_ts=message["thread_ts"]
-                )
-
-            else:
-                print(f"⚠️ Skipping message {mid} — unsupported channel or missing fields")
-
-            if success:
-                update_status(mid, message)
-                sent_count += 1
-        except Exception as e:
-            print(f"❌ Error processing message {mid}: {e}")
-        finally:
-            # Always release the lock when done
+def _process_one(message, token=None):
+    """
+    Send the reply for one processed message.
+    Returns (mid, outcome, retry_after) where outcome is "sent", "failed", "skipped" or
+    "deferred"; retry_after is only set for "deferred".
+    """
+    mid = message.get("mid")
+    if not mid:
+        return mid, "skipped", None
+
+    # Try to acquire a lock for this message
+    if not acquire_lock(mid):
+        print(f"⏭️ Skipping message {mid} - already being processed by another worker")
+        return mid, "skipped", None
+
+    success = False
+    try:
+        channel = (message.get("channel") or "").lower()
+        reply = message.get("reply")
+
+        if not reply:
+            print(f"⚠️ Skipping message {mid} — no reply content")
+            return mid, "skipped", None
+
+        if channel == "email" and message.get("msg_id"):
+            success = reply_to_email(
+                message_id=message["msg_id"],
+                response_body=message["reply"],
+                token=token
+            )
+
+        elif channel == "slack" and message.get("channel_id") and message.get("thread_ts"):
+            success = send_slack_reply(
+                channel_id=message["channel_id"],
+                message_text=message["reply"],
+                thread_ts=message["thread_ts"]
+            )
+
+        else:
+            print(f"⚠️ Skipping message {mid} — unsupported channel or missing fields")
+            return mid, "skipped", None
+
+        # Status is written for the whole batch once the pool finishes
+        return mid, ("sent" if success else "failed"), None
+    except ReplyThrottled as e:
+        # Marked deferred and re-queued once the pool finishes, rather than sleeping in the worker
+        print(f"⏳ Throttled on message {mid}, retrying in {e.retry_after}s")
+        return mid, "deferred", e.retry_after
+    except Exception as e:
+        print(f"❌ Error processing message {mid}: {e}")
+        return mid, "failed", None
+    finally:
+        # Sent messages stay locked until their status is written, so an
+        # overlapping run can't pick them up again in between
+        if not success:
             release_lock(mid)
-    
-    return f"Processed {len(mids)} messages, sent {sent_count} replies"
+
+def update_statuses(mids, status="successful", claim_id=None, retry_at=None):
+    """
+    Set status on many messages in one bulk PATCH; falls back to one update per message.
+    With claim_id the server skips messages this run no longer holds, so a late write
+    can't clobber a status another run or writer set after the claim.
+    """
+    if not mids:
+        return
+    try:
+        url = f"{BASE_API_URL}/api/v1/messages/bulk_status"
+        payload = [{"mid": mid, "status": status, "processed": True, "claim_id": claim_id} for mid in mids]
+        if retry_at:
+            for patch in payload:
+                patch["retry_at"] = retry_at
+        response = _session.patch(url, data=orjson.dumps(payload), headers=_JSON_HEADERS)
+        response.raise_for_status()
+        print(f"✅ Marked {len(mids)} messages {status}")
+    except Exception as e:
+        print(f"❌ Bulk status update failed, updating one by one: {e}")
+        for mid in mids:
+            update_status(mid, status, claim_id, retry_at)
+
+@celery_app.task(bind=True, name='app.listeners.reply.send_pending_replies_task')
+def send_pending_replies_task(self, mids=None):
+    """Celery task to process messages and send replies; `mids` limits the run to those messages"""
+    wanted = set(mids) if mids else None
+    # One claim per run: every status this run writes is conditional on still holding it
+    claim_id = uuid.uuid4().hex
+    found = 0
+    futures = []
+
+    # Replies are independent and I/O bound, so overlap them; the pool stays
+    # below _session's pool_maxsize so every thread keeps a warm connection.
+    # Batches are claimed and dispatched as they stream in rather than after the full listing.
+    with ThreadPoolExecutor(max_workers=REPLY_WORKERS) as executor:
+        for batch in _batches(iter_claimable_messages(), CLAIM_BATCH_SIZE):
+            if wanted:
+                batch = [m for m in batch if m.get("mid") in wanted]
+            found += len(batch)
+
+            # Only reply to what this run managed to claim; an overlapping run gets the rest
+            claimed = set(claim_messages([m["mid"] for m in batch if m.get("mid")], claim_id))
+            batch = [m for m in batch if m.get("mid") in claimed]
+
+            # Only pay for the Graph token when the batch actually has email replies
+            has_email = any((m.get("channel") or "").lower() == "email" and m.get("msg_id") for m in batch)
+            token = None
+            if has_email:
+                try:
+                    token = get_access_token()
+                except Exception as e:
+                    # Leave it to each email reply to fetch (and fail) inside _process_one,
+                    # so this batch's outcomes and earlier batches' statuses still get written
+                    print(f"❌ Failed to fetch Graph token for batch: {e}")
+
+            futures.extend(executor.submit(_process_one, message, token) for message in batch)
+        outcomes = [future.result() for future in futures]
+    print(f"🔍 Found {found} claimable messages")
+
+    sent_mids = [mid for mid, outcome, _ in outcomes if outcome == "sent"]
+    update_statuses(sent_mids, claim_id=claim_id)
+    for mid in sent_mids:
+        release_lock(mid)
+
+    # Throttled messages become 'deferred' until their Retry-After passes, so the beat
+    # runs can't claim them early; the delayed task then claims them itself
+    deferred = {}
+    for mid, outcome, retry_after in outcomes:
+        if outcome == "deferred":
+            deferred.setdefault(retry_after, []).append(mid)
+    for retry_after, deferred_mids in deferred.items():
+        retry_at = (datetime.now(timezone.utc) + timedelta(seconds=retry_after)).isoformat()
+        update_statuses(deferred_mids, status="deferred", claim_id=claim_id, retry_at=retry_at)
+        self.apply_async(args=[deferred_mids], countdown=retry_after)
+
+    # Failed and skipped messages go back to 'processed' for a later run
+    update_statuses([mid for mid, outcome, _ in outcomes if outcome in ("failed", "skipped") and mid], status="processed", claim_id=claim_id)
+    results = Counter(outcome for _, outcome, _ in outcomes)
+
+    return (f"Processed {found} messages, sent {results['sent']} replies, "
+            f"{results['failed']} failed, {results['skipped']} skipped, {results['deferred']} deferred")
 
 def process_messages():
     """Original function to process messages in a loop"""
@@ -117,7 +117,7 @@ class MidMessageProcessor:
                         task_data["status"] = "successful"
                         
                         # Update task
-                        update_response = requests.put(url, json=task_data)
+                        update_response = requests.put(url, json=task_data, headers={"Prefer": "return=minimal"})
                         update_response.raise_for_status()
                         logger.info(f"Successfully updated git task {task_id} to successful")
                     except Exception as e:
@@ -137,7 +137,7 @@ class MidMessageProcessor:
                         task_data["status"] = "successful"
                         
                         # Update task
-                        update_response = requests.put(url, json=task_data)
+                        update_response = requests.put(url, json=task_data, headers={"Prefer": "return=minimal"})
                         update_response.raise_for_status()
                         logger.info(f"Successfully updated jira task {task_id} to successful")
                     except Exception as e:
@@ -232,7 +232,7 @@ class MidMessageProcessor:
             message_data["reply"] = reply
             message_data["completion_date"] = datetime.now(timezone.utc).isoformat()
 
-            update_response = requests.put(url, json=message_data)
+            update_response = requests.put(url, json=message_data, headers={"Prefer": "return=minimal"})
             update_response.raise_for_status()
             logger.info(f"Message {mid} updated with reply")
             return True
@@ -1,14 +1,25 @@
 import os
+import re
 import logging
+import threading
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+import pybreaker
 from dotenv import load_dotenv
-from slack_bolt import App
+from slack_bolt.async_app import AsyncApp
 from slack_sdk import WebClient
-from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_bolt.adapter.socket_mode.aiohttp import AsyncSocketModeHandler
 import requests
-from datetime import datetime, timezone, timedelta
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import timedelta
 from app.celery_app import celery_app
+from app.utils.rate_limit import slack_post_limiter
+from app.utils.timestamps import now_iso
 from groq import Groq
-import json
+import orjson
 import asyncio
 from ..services.follow_up import analyze_and_enhance_question
 
@@ -18,85 +29,203 @@ SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_APP_TOKEN = os.getenv("SLACK_APP_TOKEN")
 BASE_API_URL = os.getenv("BASE_API_URL")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")  # Keep as fallback
+_JSON_HEADERS = {"Content-Type": "application/json"}  # Bodies are pre-encoded with orjson
+_HTTP_TIMEOUT = (3.05, 10)  # (connect, read) for every backend call; never block a worker indefinitely
+PENDING_WORKERS = int(os.getenv("SLACK_PENDING_WORKERS", "16"))  # Parallel PUTs when draining pending messages
 
 # ——— LOGGER + SLACK INIT ———
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-app = App(token=SLACK_BOT_TOKEN)
+# Socket Mode events are handled on an asyncio loop so a slow ack/enqueue never
+# blocks other events; the Celery tasks keep using the sync WebClient below
+app = AsyncApp(token=SLACK_BOT_TOKEN)
 
 client = WebClient(token=SLACK_BOT_TOKEN)
-# Don't initialize Groq client globally - we'll create per-user instances
 
-# ─── PERMISSION CHECK HELPER ───────────────────────────────────────────────────
-def check_user_permission(email: str, base_api_url: str) -> bool:
-    """Checks if a user is allowed by querying the agent_users status endpoint."""
-    if not email or email == "Unknown" or "@" not in email: # Basic email validity check
-        logger.warning(f"Permission check: No valid email provided ('{email}'). Denying permission.")
-        return False
-    if not base_api_url: # Check if BASE_API_URL is configured
-        logger.error("Permission check: BASE_API_URL not configured. Denying permission.")
-        return False
+# ─── HTTP SESSION ──────────────────────────────────────────────────────────────
+# One pooled keep-alive session for all backend calls; retries only cover idempotent
+# methods (GET/PUT) on gateway errors
+SESSION = requests.Session()
+SESSION.mount(BASE_API_URL or "http://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
+SESSION.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+
+# Stop calling the backend for a while after repeated failures instead of
+# tying up every worker on timeouts; calls fail fast with CircuitBreakerError
+_backend_breaker = pybreaker.CircuitBreaker(fail_max=5, reset_timeout=30)
+
+# ─── GROQ CLIENT CACHE ─────────────────────────────────────────────────────────
+# Bounded, and entries expire so rotated keys don't pin old clients forever
+_groq_clients = TTLCache(maxsize=512, ttl=3600)
+_groq_lock = threading.Lock()
+# One connection pool shared by every Groq client; the SDK sets the API key per request.
+# Created lazily so each forked worker opens its own sockets.
+_groq_http = None
+
+def _groq_for_key(api_key: str) -> Groq:
+    """Process-wide Groq client per API key, so users sharing a key share a connection pool."""
+    global _groq_http
+    with _groq_lock:
+        groq_client = _groq_clients.get(api_key)
+        if groq_client is None:
+            if _groq_http is None:
+                _groq_http = httpx.Client(limits=httpx.Limits(max_connections=64, max_keepalive_connections=32))
+            groq_client = Groq(api_key=api_key, http_client=_groq_http)
+            _groq_clients[api_key] = groq_client
+        return groq_client
+
+def _reset_groq_clients():
+    """Drop all cached Groq clients (e.g. after an API key rotation)."""
+    with _groq_lock:
+        _groq_clients.clear()
+
+# ─── USER PROFILE (PERMISSION + GROQ KEY) ──────────────────────────────────────
+# Successful profile lookups are reused for a few minutes; failures are never cached
+_profile_cache = TTLCache(maxsize=4096, ttl=300)
+_profile_lock = threading.Lock()  # TTLCache is not thread-safe; the pending pool shares it
+
+def invalidate(email: str):
+    """Forget the cached profile and any cached denial for email, e.g. right after an admin changes access."""
+    with _profile_lock:
+        _profile_cache.pop(email, None)
+    with _denied_user_lock:
+        for user_id in [u for u, denied_email in _denied_user_cache.items() if denied_email == email]:
+            _denied_user_cache.pop(user_id, None)
+
+def _fetch_user_profile(email: str, base_api_url: str = None):
+    """
+    Returns {"uid", "status", "groq_api"} for the agent user with this email,
+    or None if the user is unknown or the lookup failed. One backend call
+    serves both the permission check and the Groq key lookup.
+    """
+    base_api_url = base_api_url or BASE_API_URL
+    with _profile_lock:
+        profile = _profile_cache.get(email)
+    if profile is not None:
+        return profile
     try:
-        response = requests.get(f"{base_api_url}/api/v1/agent_users/status/email/{email}", timeout=10)
+        response = _backend_breaker.call(SESSION.get, f"{base_api_url}/api/v1/agent_users/profile/{email}", timeout=_HTTP_TIMEOUT)
         if response.status_code == 200:
-            status = response.json()
-            if status == "allowed":
-                logger.info(f"Permission check for {email}: ALLOWED")
-                return True
-            else:
-                logger.info(f"Permission check for {email}: NOT ALLOWED (status: {status})")
-
-                return False
+            profile = orjson.loads(response.content)
+            with _profile_lock:
+                _profile_cache[email] = profile
+            return profile
         elif response.status_code == 404:
-            logger.warning(f"Permission check for {email}: User not found (404). Denying permission.")
-            return False
+            logger.warning("Profile lookup for %s: User not found (404).", email)
         else:
-            logger.error(f"Permission check for {email}: Error checking status ({response.status_code} {response.text}). Denying permission.")
-            return False
+            logger.error("Profile lookup for %s: Error (%s %s).", email, response.status_code, response.text)
+    except pybreaker.CircuitBreakerError:
+        logger.error("Profile lookup for %s: Backend circuit open, skipping request.", email)
     except requests.Timeout:
-        logger.error(f"Permission check for {email}: Request timed out. Denying permission.")
-        return False
+        logger.error("Profile lookup for %s: Request timed out.", email)
     except requests.RequestException as e:
-        logger.error(f"Permission check for {email}: Request failed ({e}). Denying permission.")
-        return False
+        logger.error("Profile lookup for %s: Request failed (%s).", email, e)
     except ValueError as e: # Handles JSON decoding errors
-        logger.error(f"Permission check for {email}: Failed to decode JSON response ({e}). Denying permission.")
-        return False
-def get_groq_api_key(sender_email):
-    try:
-        response = requests.get(f"{BASE_API_URL}/api/v1/agent_users/groq/{sender_email}", timeout=10)
+        logger.error("Profile lookup for %s: Failed to decode JSON response (%s).", email, e)
+    return None
 
-        if response.status_code == 200:
-            data = response.json()
-            api_key = data.get("id")
-            if api_key:
-                return api_key
-            else:
-                logger.error(f"No API key found in response for {sender_email}")
-                return None
-        else:
-            logger.error(f"Failed to get API key for {sender_email}, status code: {response.status_code}")
-            return None
+# ─── PERMISSION CHECK HELPER ───────────────────────────────────────────────────
+def check_user_permission(email: str, base_api_url: str) -> Optional[bool]:
+    """
+    Checks if a user is allowed, based on their agent user profile.
+    Returns None rather than False when no profile could be fetched (unknown user,
+    backend error, open breaker), so callers can tell that apart from a denial.
+    """
+    if not email or email == "Unknown" or "@" not in email: # Basic email validity check
+        logger.warning("Permission check: No valid email provided ('%s'). Denying permission.", email)
+        return False
+    if not base_api_url: # Check if BASE_API_URL is configured
+        logger.error("Permission check: BASE_API_URL not configured. Denying permission.")
+        return None
+    profile = _fetch_user_profile(email, base_api_url)
+    if profile is None:
+        logger.info("Permission check for %s: no profile available. Denying permission.", email)
+        return None
+    status = profile.get("status")
+    if status == "allowed":
+        logger.info("Permission check for %s: ALLOWED", email)
+        return True
+    logger.info("Permission check for %s: NOT ALLOWED (status: %s)", email, status)
+    return False
 
-    except Exception as e:
-        logger.exception(f"Exception occurred while fetching Groq API key for {sender_email}: {e}")
+def get_groq_api_key(sender_email):
+    profile = _fetch_user_profile(sender_email)
+    if profile is None:
+        logger.error("Failed to get API key for %s: no profile available", sender_email)
+        return None
+    api_key = profile.get("groq_api")
+    if not api_key:
+        logger.error("No API key found in profile for %s", sender_email)
         return None
+    return api_key
+
+def get_uid_for_email(email):
+    """Returns the agent user's uid from the cached profile, or "" if unavailable."""
+    profile = _fetch_user_profile(email)
+    if profile is None:
+        logger.warning("Failed to fetch UID for email %s", email)
+        return ""
+    return profile.get("uid") or ""
+
+# Status fields every update resets the message to
+_UPDATE_STATUS = {"processed": False, "status": "pending"}
+
+# Fields copied from the message into the update payload, with their defaults
+_PAYLOAD_DEFAULTS = (
+    ("content", ""),
+    ("reply", ""),
+    ("message_type", "user_message"),
+    ("username", ""),
+    ("message_datetime", None),
+    ("sid", ""),
+    ("uid", ""),
+    ("pid", ""),
+    ("source", "slack"),
+    ("msg_id", ""),
+    ("channel", "slack"),
+    ("channel_id", ""),
+    ("thread_ts", ""),
+)
+
+def _send_json(method, path, payload):
+    """Encode payload once with orjson and send it to the backend through the shared session."""
+    body = orjson.dumps(payload)
+    return _backend_breaker.call(
+        method,
+        f"{BASE_API_URL}{path}",
+        data=body,
+        headers={**_JSON_HEADERS, "Content-Length": str(len(body))},
+        timeout=_HTTP_TIMEOUT
+    )
+
+def _post_json(path, payload):
+    return _send_json(SESSION.post, path, payload)
+
+def _put_json(path, payload):
+    return _send_json(SESSION.put, path, payload)
+
+def _put_message(mid, payload):
+    """PUT one message's update; True on success."""
+    response = _put_json(f"/api/v1/messages/{mid}", payload)
+    if response.status_code == 200:
+        logger.info("Updated message %s with reply and context data", mid)
+        return True
+    logger.error("Update failed: %s %s", response.status_code, response.text)
+    return False
 
 class ContextAwareSlackHandler:
     def __init__(self):
         self.history_window = timedelta(hours=48)  # Look back 48 hours for context
-        self.groq_clients = {}  # Cache of Groq clients by user email
 
     def get_groq_client(self, email: str):
         """
         Get a Groq client for the specified user email.
-        Uses cached client if available, otherwise creates a new one.
+        Clients are shared per API key across the process.
         Falls back to environment variable if user key not available.
         """
-        # Return cached client if available
-        if email in self.groq_clients:
-            return self.groq_clients[email]
-            
         # Get API key for this user
         api_key = get_groq_api_key(email)
         
@@ -104,18 +233,15 @@ class ContextAwareSlackHandler:
         if not api_key:
             if GROQ_API_KEY:
                 api_key = GROQ_API_KEY
-                logger.warning(f"Using fallback GROQ API key for {email}")
+                logger.warning("Using fallback GROQ API key for %s", email)
             else:
-                logger.error(f"No GROQ API key available for {email} and no fallback configured")
+                logger.error("No GROQ API key available for %s and no fallback configured", email)
                 return None
                 
-        # Create and cache the client
         try:
-            client = Groq(api_key=api_key)
-            self.groq_clients[email] = client
-            return client
+            return _groq_for_key(api_key)
         except Exception as e:
-            logger.error(f"Failed to create Groq client for {email}: {e}")
+            logger.error("Failed to create Groq client for %s: %s", email, e)
             return None
 
 
@@ -123,6 +249,11 @@ class ContextAwareSlackHandler:
         """
         Update a message in the database with the generated reply and any context enhancements
         """
+        # Nothing generated yet: the PUT would rewrite exactly what the POST just stored
+        if not message.get("reply") and not message.get("context_enhanced") and not message.get("extracted_info"):
+            logger.debug("No reply or context data for message %s, skipping update", mid)
+            return True
+
         try:
             # Include any enhanced content flags and extracted information
             context_metadata = {}
@@ -139,34 +270,16 @@ class ContextAwareSlackHandler:
                     context_metadata = {}
                 context_metadata["extracted_info"] = message.get("extracted_info")
             
-            payload = {
-                "content": message.get("content", ""),
-                "reply": message.get("reply", ""),
-                "message_type": message.get("message_type", "user_message"),
-                "processed": False,
-                "status": "pending",
-                "username": message.get("username", ""),
-                "message_datetime": message.get("message_datetime", datetime.now(timezone.utc).isoformat()),
-                "sid": message.get("sid", ""),
-                "uid": message.get("uid", ""),
-                "pid": message.get("pid", ""),
-                "source": message.get("source", "slack"),
-                "msg_id": message.get("msg_id", ""),
-                "channel": message.get("channel", "slack"),
-                "channel_id": message.get("channel_id", ""),
-                "thread_ts": message.get("thread_ts", ""),
-                "metadata": context_metadata if context_metadata else message.get("metadata", {})
-            }
-
-            response = requests.put(f"{BASE_API_URL}/api/v1/messages/{mid}", json=payload)
-            if response.status_code == 200:
-                logger.info(f"Updated message {mid} with reply and context data")
-                return True
-            else:
-                logger.error(f"Update failed: {response.status_code} {response.text}")
-                return False
+            payload = {k: message.get(k, d) for k, d in _PAYLOAD_DEFAULTS}
+            payload.update(_UPDATE_STATUS)
+            if not payload["message_datetime"]:
+                payload["message_datetime"] = now_iso()
+            payload["metadata"] = context_metadata if context_metadata else message.get("metadata", {})
+
+            # Written inline so the caller sees failures and the status can't land after a newer one
+            return _put_message(mid, payload)
         except Exception as e:
-            logger.error(f"Error updating message {mid}: {e}")
+            logger.error("Error updating message %s: %s", mid, e)
             return False
             
     def process_new_message(self, message):
@@ -192,155 +305,210 @@ class ContextAwareSlackHandler:
 # Create a global instance of the handler
 slack_handler = ContextAwareSlackHandler()
 
-def create_message_in_db(username, text, msg_ts, channel_id,uid):
+# Reused across task runs; threads are only started once work is submitted
+_pending_executor = ThreadPoolExecutor(max_workers=PENDING_WORKERS, thread_name_prefix="slack-pending")
+
+# Fields that are the same for every new Slack message; copied and filled per message
+_PAYLOAD_TEMPLATE = {
+    "sid": "680f69cc5c250a63d068bbec",  # Static for now
+    "pid": "60c72b2f9b1e8a3f4c8a1b2c",
+    "reply": "",
+    "source": "slack",
+    "msg_id": "",
+    "channel": "slack",
+    "message_type": "user_message",
+    "processed": False,
+    "status": "pending",
+}
+
+def create_message_in_db(username, text, msg_ts, channel_id, uid=""):
     """
-    Create a new message in the database.
-    The user_email_for_context is not directly saved but used for context if needed by process_new_message.
+    Create a new message in the database, then hand it to the context-aware handler.
+    Returns the new message's mid, or None if the backend rejected it.
     """
-    sid = "680f69cc5c250a63d068bbec"  # Static for now
-    pid = "60c72b2f9b1e8a3f4c8a1b2c"
-
-    payload = {
-        "sid": sid,
-        "uid": uid,
-        "pid": pid,
-        "username": username,
-        "content": text,
-        "reply": "",
-        "message_datetime": datetime.utcnow().isoformat() + "Z",
-        "source": "slack",
-        "msg_id": "",
-        "channel": "slack",
-        "channel_id": channel_id,
-        "thread_ts": msg_ts,
-        "message_type": "user_message",
-        "processed": False,
-        "status": "pending"
-    }
+    payload = _PAYLOAD_TEMPLATE.copy()
+    payload["uid"] = uid
+    payload["username"] = username
+    payload["content"] = text
+    payload["message_datetime"] = now_iso()
+    payload["channel_id"] = channel_id
+    payload["thread_ts"] = msg_ts
 
     try:
-        resp = requests.post(f"{BASE_API_URL}/api/v1/messages/", json=payload)
+        resp = _post_json("/api/v1/messages/", payload)
         if resp.status_code in (200, 201):
-            logger.info(f"Message saved to DB: {msg_ts}")
+            logger.info("Message saved to DB: %s", msg_ts)
             # Get the message ID from the response
-            message_id = resp.json().get("mid") if resp.headers.get("content-type") == "application/json" else resp.text
+            message_id = orjson.loads(resp.content).get("mid") if resp.headers.get("content-type") == "application/json" else resp.text
             
-            # Create the message object with the returned ID
-            message = payload.copy()
-            message["mid"] = message_id
+            # The payload isn't used elsewhere, so it becomes the message object as-is
+            payload["mid"] = message_id
             
             # Process the message with context awareness
-            slack_handler.process_new_message(message)
+            slack_handler.process_new_message(payload)
             return message_id
         else:
-            logger.error(f"Failed to save message {msg_ts}: {resp.status_code} {resp.text}")
+            logger.error("Failed to save message %s: %s %s", msg_ts, resp.status_code, resp.text)
             return None
     except Exception as e:
-        logger.error(f"Error posting message to DB: {e}")
+        logger.error("Error posting message to DB: %s", e)
         return None
 
-@app.event("message")
-def handle_message_events(event, say):
-    user_id = event.get("user") # Renamed from 'user' to 'user_id' for clarity
-    text = event.get("text", "").strip()
-    subtype = event.get("subtype")
-    channel_type = event.get("channel_type")
-    channel_id = event.get("channel")
-    ts = event.get("ts")
-    uid=""
-    if subtype or not user_id or not text:
-        return
-
-    if channel_type in ("im", "mpim"):  # Direct Message
-        try:
-            user_info_response = app.client.users_info(user=user_id)
-            user_profile = user_info_response["user"]["profile"]
-            username = user_profile.get("real_name") or user_profile.get("display_name") or user_id
-            email = user_profile.get("email")
-
-            if not email:
-                logger.warning(f"Could not retrieve email for user {username} ({user_id}). Cannot check permissions.")
-                say("I couldn't verify your permissions because your email is not available. Please check your Slack profile.")
-                return
-
-            logger.info(f"DM from {username} ({email}): {text}")
-
-            # === PERMISSION CHECK ===
-            if not check_user_permission(email, BASE_API_URL):
-                logger.warning(f"User {username} ({email}) is not allowed for DM interaction.")
-
-                say("Sorry, you are not authorized to use this feature.")
-                return
-            
-            if email:
-                try:
-                    response = requests.get(f"{BASE_API_URL}/api/v1/agent_users/{email}", timeout=10)
-
-                    if response.status_code == 200:
-                        uid = response.json()["id"]
-                    else:
-                        print(f"Warning: Failed to fetch UID for email {email}: {response.status_code}")
-                except Exception as e:
-                    print(f"Error fetching UID for email {email}: {e}")
-            
-            enhanced_question = analyze_and_enhance_question(text, uid)
-            # Save message to DB and process with context awareness
-            create_message_in_db(username, enhanced_question, ts, channel_id,uid)
-        except Exception as e:
-            logger.error(f"Error in handle_message_events for user {user_id}: {e}", exc_info=True)
-            say("Sorry, an error occurred while processing your message.")
-
-@app.event("app_mention")
-def handle_app_mention(event, say):
+def _say(channel_id, text):
+    """Post a plain message back to the Slack channel the event came from."""
+    try:
+        slack_post_limiter.acquire(channel_id)
+        client.chat_postMessage(channel=channel_id, text=text)
+    except Exception as e:
+        logger.error("Failed to post Slack message to %s: %s", channel_id, e)
+
+# The bot's own user id never changes for the lifetime of the process
+_BOT_ID = None
+_BOT_ID_LOCK = threading.Lock()
+_MENTION_RE = None  # Matches <@BOTID> and aliased <@BOTID|name> mentions, built with _BOT_ID
+
+def _get_bot_id():
+    """Returns the bot user id, calling auth.test only the first time."""
+    global _BOT_ID, _MENTION_RE
+    if _BOT_ID is None:
+        with _BOT_ID_LOCK:
+            if _BOT_ID is None:
+                bot_id = client.auth_test()["user_id"]
+                _MENTION_RE = re.compile(rf"<@{re.escape(bot_id)}(?:\|[^>]+)?>")
+                _BOT_ID = bot_id
+    return _BOT_ID
+
+def _strip_bot_mention(text):
+    """Removes every mention of the bot from text."""
+    _get_bot_id()
+    return _MENTION_RE.sub("", text).strip()
+
+# Slack profiles (name, email) barely change; keep them for 30 minutes per user id
+_slack_user_cache = TTLCache(maxsize=4096, ttl=1800)
+_slack_user_lock = threading.Lock()
+
+def resolve_user(user_id):
+    """
+    Returns (username, email) for a Slack user id, calling users.info only on a
+    cache miss. email is None when the profile doesn't expose one.
+    """
+    with _slack_user_lock:
+        user = _slack_user_cache.get(user_id)
+    if user is not None:
+        return user
+    profile = client.users_info(user=user_id)["user"]["profile"]
+    user = (profile.get("real_name") or profile.get("display_name") or user_id, profile.get("email"))
+    with _slack_user_lock:
+        _slack_user_cache[user_id] = user
+    return user
+
+# Slack user id -> email for senders whose profile recently said they are not allowed
+_denied_user_cache = TTLCache(maxsize=8192, ttl=600)
+_denied_user_lock = threading.Lock()
+
+# Per-event-type wording for logs and user-facing replies
+_EVENT_TEXT = {
+    "message": {
+        "label": "DM",
+        "context": "",
+        "no_email": "I couldn't verify your permissions because your email is not available. Please check your Slack profile.",
+        "denied_label": "DM",
+        "handler": "handle_message_events",
+        "error": "Sorry, an error occurred while processing your message.",
+    },
+    "app_mention": {
+        "label": "Mention",
+        "context": " in app_mention",
+        "no_email": "I couldn't verify your permissions because your email is not available. Please check your Slack profile or contact an admin.",
+        "denied_label": "app_mention",
+        "handler": "handle_app_mention",
+        "error": "Sorry, an error occurred while processing your mention.",
+    },
+}
+
+def _process_event(event, event_type):
+    """Shared pipeline for DMs and mentions: profile, permission, uid, enhancement, DB write."""
+    texts = _EVENT_TEXT[event_type]
     user_id = event.get("user") # Renamed from 'user' to 'user_id' for clarity
     text = event.get("text", "")
+    if event_type == "message":
+        text = text.strip()
     channel_id = event.get("channel")
     ts = event.get("ts")
+    uid = ""
 
-    if not user_id or not text:
-        return
+    # Known-denied senders are dropped before any Slack or backend call
+    with _denied_user_lock:
+        if user_id in _denied_user_cache:
+            logger.debug("Dropping %s from denied user %s", event_type, user_id)
+            return
 
     try:
-        # Get user info
-        user_info_response = app.client.users_info(user=user_id)
-        user_profile = user_info_response["user"]["profile"]
-        username = user_profile.get("real_name") or user_profile.get("display_name") or user_id
-        email = user_profile.get("email")
+        username, email = resolve_user(user_id)
 
         if not email:
-            logger.warning(f"Could not retrieve email for user {username} ({user_id}) in app_mention. Cannot check permissions.")
-            say("I couldn't verify your permissions because your email is not available. Please check your Slack profile or contact an admin.")
+            logger.warning("Could not retrieve email for user %s (%s)%s. Cannot check permissions.", username, user_id, texts['context'])
+            _say(channel_id, texts["no_email"])
             return
 
-        bot_id_response = app.client.auth_test()
-        bot_id = bot_id_response["user_id"]
-        mention = f"<@{bot_id}>"
-        stripped_text = text.replace(mention, "").strip()
-
-        logger.info(f"Mention by {username} ({email}): {stripped_text}")
+        shown_text = _strip_bot_mention(text) if event_type == "app_mention" else text
+        logger.info("%s from %s (%s): %s", texts['label'], username, email, shown_text)
 
         # === PERMISSION CHECK ===
-        if not check_user_permission(email, BASE_API_URL):
-            logger.warning(f"User {username} ({email}) is not allowed for app_mention interaction.")
-            say("Sorry, you are not authorized to use this feature.")
+        allowed = check_user_permission(email, BASE_API_URL)
+        if allowed is None:
+            # Lookup failed: not remembered, so the next message checks again
+            logger.warning("Could not verify permissions for %s (%s) for %s interaction.", username, email, texts['denied_label'])
+            _say(channel_id, "Sorry, I couldn't verify your permissions right now. Please try again shortly.")
             return
-        if email:
-            try:
-                response = requests.get(f"{BASE_API_URL}/api/v1/agent_users/{email}", timeout=10)
-
-                if response.status_code == 200:
-                    uid = response.json()["id"]
-                else:
-                    print(f"Warning: Failed to fetch UID for email {email}: {response.status_code}")
-            except Exception as e:
-                print(f"Error fetching UID for email {email}: {e}")
-        
+        if not allowed:
+            logger.warning("User %s (%s) is not allowed for %s interaction.", username, email, texts['denied_label'])
+            with _denied_user_lock:
+                _denied_user_cache[user_id] = email
+            _say(channel_id, "Sorry, you are not authorized to use this feature.")
+            return
+
+        uid = get_uid_for_email(email)
+
         enhanced_question = analyze_and_enhance_question(text, uid)
         # Save message to DB and process with context awareness
-        create_message_in_db(username, enhanced_question, ts, channel_id,uid)
+        create_message_in_db(username, enhanced_question, ts, channel_id, uid)
     except Exception as e:
-        logger.error(f"Error in handle_app_mention for user {user_id}: {e}", exc_info=True)
-        say("Sorry, an error occurred while processing your mention.")
+        logger.error("Error in %s for user %s: %s", texts['handler'], user_id, e, exc_info=True)
+        _say(channel_id, texts["error"])
+
+@celery_app.task(name='app.listeners.slack.process_slack_message_task')
+def process_slack_message_task(event, event_type):
+    """
+    Celery task doing the heavy lifting for a Slack event (profile lookup,
+    permission check, LLM question enhancement and DB write) off the listener.
+    """
+    _process_event(event, "app_mention" if event_type == "app_mention" else "message")
+
+@app.event("message")
+async def handle_message_events(event, ack):
+    # ACK straight away so Slack doesn't redeliver while the LLM pipeline runs
+    await ack()
+    user_id = event.get("user") # Renamed from 'user' to 'user_id' for clarity
+    text = event.get("text", "").strip()
+    subtype = event.get("subtype")
+    channel_type = event.get("channel_type")
+    if subtype or not user_id or not text:
+        return
+
+    if channel_type in ("im", "mpim"):  # Direct Message
+        await asyncio.to_thread(process_slack_message_task.delay, event, "message")
+
+@app.event("app_mention")
+async def handle_app_mention(event, ack):
+    await ack()
+    user_id = event.get("user") # Renamed from 'user' to 'user_id' for clarity
+    text = event.get("text", "")
+
+    if not user_id or not text:
+        return
+
+    await asyncio.to_thread(process_slack_message_task.delay, event, "app_mention")
 
 @celery_app.task(name='app.listeners.slack.process_pending_messages')
 def process_pending_messages():
@@ -348,15 +516,34 @@ def process_pending_messages():
     Celery task to process any pending messages in the database
     """
     try:
-        response = requests.get(f"{BASE_API_URL}/api/v1/messages/?status=pending")
+        # The plain list endpoint has no status filter; /by_status/ returns just the pending mids
+        response = _backend_breaker.call(SESSION.get, f"{BASE_API_URL}/api/v1/messages/by_status/", params={"status": "pending"}, timeout=_HTTP_TIMEOUT)
         if response.status_code == 200:
-            pending_messages = response.json()
-            logger.info(f"Found {len(pending_messages)} pending messages to process")
-            
-            for message in pending_messages:
-                slack_handler.process_new_message(message)
+            pending_mids = [entry["mid"] for entry in orjson.loads(response.content)]
+            logger.info("Found %s pending messages to process", len(pending_mids))
+
+            # Each message is an independent blocking GET + PUT, so fan them out over the pool
+            results = list(_pending_executor.map(_process_pending_message, pending_mids))
+            logger.info("Processed %s/%s pending messages", sum(1 for ok in results if ok), len(results))
     except Exception as e:
-        logger.error(f"Error processing pending messages: {e}")
+        logger.error("Error processing pending messages: %s", e)
+
+def _process_pending_message(mid):
+    """Fetch one pending message in full and run it through the handler; False on failure."""
+    try:
+        response = _backend_breaker.call(SESSION.get, f"{BASE_API_URL}/api/v1/messages/{mid}", timeout=_HTTP_TIMEOUT)
+        if response.status_code != 200:
+            logger.error("Failed to fetch pending message %s: %s", mid, response.status_code)
+            return False
+        return slack_handler.process_new_message(orjson.loads(response.content))
+    except Exception as e:
+        logger.error("Error processing pending message %s: %s", mid, e)
+        return False
+
+async def _run_socket_mode():
+    """Serve Slack events over Socket Mode until the connection is closed."""
+    handler = AsyncSocketModeHandler(app, SLACK_APP_TOKEN)
+    await handler.start_async()
 
 @celery_app.task(name='app.listeners.slack.run_slack_listener')
 def run_slack_listener():
@@ -365,12 +552,10 @@ def run_slack_listener():
     This is a long-running task that will block until the connection is closed.
     """
     logger.info("Starting Context-Aware Slack Listener Bot from Celery task...")
-    handler = SocketModeHandler(app, SLACK_APP_TOKEN)
-    handler.start()
-    # This is a blocking call - the task will remain active as long as the socket connection is open
+    # Events are dispatched as asyncio tasks, so a burst is handled concurrently
+    asyncio.run(_run_socket_mode())
 
 # ——— ENTRY POINT ———
 if __name__ == "__main__":
     logger.info("Starting Context-Aware Slack Listener Bot directly...")
-    handler = SocketModeHandler(app, SLACK_APP_TOKEN)
-    handler.start()
\ No newline at end of file
+    asyncio.run(_run_socket_mode())
@@ -1,9 +1,11 @@
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
-from .db.mongodb import close_mongo_connection, connect_to_mongo
+from .db.mongodb import close_mongo_connection, connect_to_mongo, db as mongo_db
 # Make sure you import any routers you have defined, e.g.:
 # from .routers import items
 from .core.config import settings # Import settings
+from .utils.responses import MongoJSONResponse
 
 # Import ALL your router modules
 from .routers import (
@@ -17,6 +19,9 @@ async def lifespan(app: FastAPI):
     # Actions on startup
     print("Starting up...")
     await connect_to_mongo()
+    # Expose the shared client/database so handlers can reach them via request.app.state
+    app.state.mongo_client = mongo_db.client
+    app.state.db = mongo_db.db
     # Modified print statement - Avoid accessing .port for SRV URIs
     # Extracts host from the raw URL string for logging
     host_part = settings.MONGODB_URL.split('@')[-1].split('/')[0]
@@ -27,7 +32,16 @@ async def lifespan(app: FastAPI):
     await close_mongo_connection()
     print("MongoDB connection closed.")
 
-app = FastAPI(title=settings.PROJECT_NAME, version="0.1.0", lifespan=lifespan)
+# orjson for every JSON response instead of the stdlib encoder
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=MongoJSONResponse,
+)
+
+# Message listings sent to the workers compress well; small responses go out as-is
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Include ALL routers
 # app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
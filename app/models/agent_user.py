@@ -1,7 +1,9 @@
 from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, ConfigDict
+
+from .base import READ_ONLY_CONFIG
 
 class UserStatus(str, Enum):
     ALLOWED = "allowed"
@@ -22,6 +24,12 @@ class AgentUserUpdate(BaseModel):
 class AgentUserGroqApiUpdate(BaseModel):
     groq_api: Optional[str] = Field(None, description="GROQ API key")
     
+class AgentUserProfile(BaseModel):
+    """Everything a listener needs about a user in one lookup."""
+    uid: str
+    status: UserStatus
+    groq_api: Optional[str] = None
+
 class AgentUserInDB(AgentUserBase):
     id: str = Field(..., description="MongoDB document ID")
 
@@ -41,10 +49,9 @@ class AgentUserInDB(AgentUserBase):
 class AgentUserResponse(AgentUserBase):
     id: str
 
-    class Config:
-        from_attributes = True
-        populate_by_name = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        **READ_ONLY_CONFIG,
+        json_schema_extra={
             "example": {
                 "id": "60d5ec49f5c9e6f8e4b1c2a3",
                 "uid": "user123",
@@ -52,4 +59,5 @@ class AgentUserResponse(AgentUserBase):
                 "status": "allowed",
                 "groq_api": "your_groq_api_key_here"
             }
-        }
+        },
+    )
@@ -7,22 +7,45 @@ from pydantic import (
 )
 from pydantic_core import core_schema
 from bson import ObjectId
+from bson.errors import InvalidId
+import re
 from datetime import datetime
 from typing import List, Optional, Any
 
+# JSON schema reported for every PyObjectId field
+_OBJECT_ID_JSON_SCHEMA = {
+    "type": "string",
+    "format": "objectid", # Custom format identifier
+    "example": "60c72b2f9b1e8a3f4c8a1b2c" # Example ObjectId string
+}
+
+# 24 hex characters; fullmatch so a trailing newline is rejected too
+_is_object_id_str = re.compile(r"[0-9a-fA-F]{24}").fullmatch
+
 class PyObjectId(ObjectId):
     """
     Custom Pydantic type for MongoDB ObjectId
     """
+    # Built once and handed to every model field that uses this type
+    _cached_core_schema: Optional[core_schema.CoreSchema] = None
+
     @classmethod
     def validate(cls, v: Any, _: core_schema.ValidationInfo) -> ObjectId:
         """Validate input during parsing"""
         if isinstance(v, ObjectId):
             return v
-        if ObjectId.is_valid(v):
+        # Common case: a well-formed hex string, decoded directly without going through try/except
+        if isinstance(v, str) and _is_object_id_str(v):
+            return ObjectId(bytes.fromhex(v))
+        # ObjectId() does the same checks as is_valid(), so parse once and map its errors.
+        # None is rejected up front because ObjectId(None) would generate a new id.
+        try:
+            if v is None:
+                raise TypeError("ObjectId is None")
             return ObjectId(v)
-        # You could raise PydanticCustomError here for better error reporting
-        raise ValueError("Invalid ObjectId")
+        except (InvalidId, TypeError):
+            # You could raise PydanticCustomError here for better error reporting
+            raise ValueError("Invalid ObjectId")
 
     @classmethod
     def __get_pydantic_core_schema__(
@@ -31,7 +54,12 @@ class PyObjectId(ObjectId):
         """
         Define the core schema for ObjectId handling.
         Validates from Python ObjectId/str and JSON str, serializes to str.
+        The schema doesn't depend on `source`, so it is built once per class.
         """
+        cached = cls.__dict__.get("_cached_core_schema")
+        if cached is not None:
+            return cached
+
         from_python_schema = core_schema.with_info_plain_validator_function(cls.validate)
 
         # Define how to handle input specifically from JSON (expects a string)
@@ -43,13 +71,14 @@ class PyObjectId(ObjectId):
             ]
         )
 
-        return core_schema.json_or_python_schema(
+        cls._cached_core_schema = core_schema.json_or_python_schema(
             python_schema=from_python_schema, # How to validate from Python objects
             json_schema=from_json_schema,     # How to validate from JSON strings
             serialization=core_schema.plain_serializer_function_ser_schema(
-                lambda instance: str(instance) # Always serialize to string
+                str # Always serialize to string
             ),
         )
+        return cls._cached_core_schema
 
     @classmethod
     def __get_pydantic_json_schema__(
@@ -59,20 +88,30 @@ class PyObjectId(ObjectId):
         Explicitly define the JSON schema representation (a string).
         This overrides the generator's attempt to infer from the core schema's validator.
         """
-        # Report the schema as a simple string type
-        return {
-            "type": "string",
-            "format": "objectid", # Custom format identifier
-            "example": "60c72b2f9b1e8a3f4c8a1b2c" # Example ObjectId string
-        }
-
-# Common Model Config for handling MongoDB _id and ObjectId serialization
-common_config = ConfigDict(
+        # Report the schema as a simple string type; copied so callers can't mutate the shared dict
+        return dict(_OBJECT_ID_JSON_SCHEMA)
+
+# Common Model Config for handling MongoDB _id and ObjectId serialization.
+# PyObjectId carries its own str serializer, so no json_encoders are needed.
+common_config: ConfigDict = ConfigDict(
     populate_by_name=True,
     arbitrary_types_allowed=True,
-    json_encoders={ObjectId: str} # Add this for Pydantic v2, or if PyObjectId serialization isn't fully handling it
 )
 
+# For models that are only built from stored documents and returned, never modified.
+# frozen skips the per-attribute assignment path and makes instances hashable.
+READ_ONLY_CONFIG: ConfigDict = ConfigDict(
+    populate_by_name=True,
+    arbitrary_types_allowed=True,
+    validate_assignment=False,
+    frozen=True,
+    from_attributes=True,
+)
+
+def model_projection(model: type[BaseModel]) -> dict[str, int]:
+    """Mongo projection selecting exactly the stored fields a model reads (aliases, so `_id` is included)."""
+    return {field.alias or name: 1 for name, field in model.model_fields.items()}
+
 class BaseDocument(BaseModel):
     id: Optional[PyObjectId] = Field(default=None, alias="_id") # Use default=None for optional _id before creation
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
-from .base import PyObjectId, common_config
+from .base import PyObjectId, READ_ONLY_CONFIG
 
 class GitHubTaskBase(BaseModel):
     mid: PyObjectId # Foreign key to Message
@@ -17,4 +17,8 @@ class GitHubTaskCreate(GitHubTaskBase):
 
 class GitHubTaskInDB(GitHubTaskBase):
     git_task_id: PyObjectId = Field(alias="_id") # Renamed from id, kept alias
-    model_config = common_config
+    model_config = READ_ONLY_CONFIG
+
+# One entry of the POST /bulk response
+class GitHubTaskIdResponse(BaseModel):
+    git_task_id: PyObjectId
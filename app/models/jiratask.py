@@ -25,6 +25,10 @@ class JiraTaskInDB(JiraTaskBase):
     jira_task_id: PyObjectId = Field(alias="_id") # Renamed from id, kept alias
     model_config = common_config
 
+# One entry of the POST /bulk response
+class JiraTaskIdResponse(BaseModel):
+    jira_task_id: PyObjectId
+
 # Keep the old models commented out or remove them if no longer needed anywhere
 # class JiraTaskBase(BaseModel):
 #     session_id: PyObjectId # Link to the Session
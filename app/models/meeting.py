@@ -23,3 +23,7 @@ class MeetingInDB(MeetingBase):
     meet_id: PyObjectId = Field(alias="_id") # meet_id is the primary key, maps to _id
     mid: PyObjectId # mid is the foreign key to Message
     model_config = common_config
+
+# One entry of the POST /bulk response
+class MeetingIdResponse(BaseModel):
+    meet_id: PyObjectId
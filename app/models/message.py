@@ -38,15 +38,56 @@ class MessageInDB(MessageBase):
     mid: PyObjectId = Field(alias="_id") # Primary key
     model_config = common_config
 
+# One entry of a PUT /bulk request
+class MessageBulkUpdateItem(BaseModel):
+    mid: str
+    update: MessageCreate
+
+# Body of PATCH /{mid}: only the fields being changed.
+# With claim_id set, the update only applies while that claim still holds the message.
+class MessageStatusUpdate(BaseModel):
+    status: Optional[str] = None
+    processed: Optional[bool] = None
+    claim_id: Optional[str] = None
+    retry_at: Optional[datetime] = None # Set with status 'deferred': not claimable before this time
+
+# One entry of a PATCH /bulk_status request
+class MessageStatusPatch(BaseModel):
+    mid: str
+    status: str
+    processed: Optional[bool] = None
+    claim_id: Optional[str] = None
+    retry_at: Optional[datetime] = None
+
+# Body of POST /claim
+class MessageClaimRequest(BaseModel):
+    mids: List[str]
+    claim_id: str
+
 # New response model for returning only the MID
 class MessageMidResponse(BaseModel):
     mid: PyObjectId
     # model_config = common_config # Optional, probably not needed just for mid
 
+# Just what the reply worker needs to answer a processed message
+class MessageReplyTarget(BaseModel):
+    mid: PyObjectId = Field(alias="_id")
+    msg_id: Optional[str] = None
+    source: Optional[str] = None
+    channel: Optional[str] = None
+    channel_id: Optional[str] = None
+    thread_ts: Optional[str] = None
+    reply: Optional[str] = None
+    model_config = common_config
+
 # --- New response model for GET / ---
 class MessageContentReply(BaseModel):
     content: str
     reply: Optional[str] = None
+    # Only filled when requested through the `fields` query parameter
+    username: Optional[str] = None
+    message_datetime: Optional[datetime] = None
+    channel: Optional[str] = None
 
     class Config:
         orm_mode = True
\ No newline at end of file
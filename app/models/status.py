@@ -1,18 +1,20 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
 from typing import List, Optional # Import List and Optional
 
 # Import task models - adjust paths if necessary
-from .base import PyObjectId, common_config
+from .base import PyObjectId, READ_ONLY_CONFIG
 from .jiratask import JiraTaskInDB
 from .gittask import GitHubTaskInDB
 
 # Keep StatusBase and StatusInDB if they represent stored data,
 # even if not directly returned by the new endpoint.
+# No route uses these any more, so their schemas are only built if something validates one
 class StatusBase(BaseModel):
     pid: PyObjectId # Foreign key to Project
     start_date: datetime
     end_date: datetime
+    model_config = ConfigDict(defer_build=True)
 
 # StatusCreate is no longer needed as we removed the POST endpoint
 # class StatusCreate(StatusBase):
@@ -20,7 +22,7 @@ class StatusBase(BaseModel):
 
 class StatusInDB(StatusBase):
     status_id: PyObjectId = Field(alias="_id") # Primary key
-    model_config = common_config
+    model_config = ConfigDict(**READ_ONLY_CONFIG, defer_build=True)
 
 # StatusIdResponse is no longer needed
 # class StatusIdResponse(BaseModel):
@@ -30,4 +32,4 @@ class StatusInDB(StatusBase):
 class ProjectStatusDetails(BaseModel):
     jira_tasks: List[JiraTaskInDB]
     git_tasks: List[GitHubTaskInDB]
-    model_config = common_config # Use common config for ObjectId serialization etc.
+    model_config = READ_ONLY_CONFIG # Built once per request and returned as-is
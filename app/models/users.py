@@ -1,11 +1,11 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, field_validator
 from typing import List, Optional
-from enum import Enum # Import Enum
-from .base import PyObjectId, common_config # Assuming base.py exists
+from enum import StrEnum # Members are plain str, no wrapping needed
+from .base import PyObjectId, READ_ONLY_CONFIG # Assuming base.py exists
 from datetime import datetime # Import if any user fields need it later
 
 # Define the allowed functionalities using an Enum
-class Functionality(str, Enum):
+class Functionality(StrEnum):
     EMAIL = "email"
     SLACK = "slack"
     GITHUB = "github"
@@ -15,6 +15,9 @@ class Functionality(str, Enum):
     MICROSOFT_TEAMS = "microsoft teams"
     VISUAL_STUDIO = "visual studio"
 
+# Every valid functionality string, for a set lookup instead of per-item enum coercion
+_ALLOWED_FUNCTIONALITY = frozenset(Functionality)
+
 # Renamed from AgentBase
 class UserBase(BaseModel):
     email: EmailStr # Kept EmailStr
@@ -24,6 +27,16 @@ class UserBase(BaseModel):
     role: str
     # Renamed allowed_functionalities to allowed_functionality
     allowed_functionality: List[Functionality] = Field(default_factory=list) # Kept List[Functionality]
+    # Store and serialize the bare string values rather than enum members
+    model_config = ConfigDict(use_enum_values=True)
+
+    @field_validator("allowed_functionality", mode="wrap")
+    @classmethod
+    def _known_functionality(cls, v, handler):
+        """Lists of known values are kept as-is; anything else goes through normal enum validation."""
+        if isinstance(v, list) and all(isinstance(f, str) and f in _ALLOWED_FUNCTIONALITY for f in v):
+            return v
+        return handler(v)
 
 # Renamed from AgentCreate
 class UserCreate(UserBase):
@@ -32,7 +45,7 @@ class UserCreate(UserBase):
 # Renamed from AgentInDB
 class UserInDB(UserBase):
     uid: PyObjectId = Field(alias="_id") # Changed id to uid, kept alias
-    model_config = common_config
+    model_config = READ_ONLY_CONFIG
 
 # New response model for returning only the UID
 class UserUidResponse(BaseModel):
@@ -1,29 +1,35 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Path
 from motor.motor_asyncio import AsyncIOMotorDatabase
 # bson imports are not strictly needed here if all ObjectId handling is in services
 # from bson import ObjectId 
 # from bson.son import SON
 
 # Models will now have .email and .status
-from app.models.agent_user import AgentUserCreate, AgentUserUpdate, AgentUserResponse, UserStatus,AgentUserGroqApiUpdate
+from app.models.agent_user import AgentUserCreate, AgentUserUpdate, AgentUserResponse, UserStatus,AgentUserGroqApiUpdate, AgentUserProfile
 from app.services.agent_user import (
     create_agent_user,
     get_agent_user_by_id,
     get_agent_user_by_uid,
-    get_all_agent_users,
+    find_all_agent_users,
     update_agent_user,
     delete_agent_user,
     get_agent_user_status_by_email,
     get_agent_user_by_email,
+    get_agent_user_fields_by_email,
     update_agent_user_groq_api,
     get_db # Re-using the get_db from services
 )
 from pydantic import EmailStr # For email validation in path parameter
+from app.utils.responses import stream_documents
+from app.models.base import model_projection
 
 router = APIRouter()
 
+# `id` isn't stored; Mongo returns _id unless a projection excludes it
+AGENT_USER_PROJECTION = model_projection(AgentUserResponse)
+
 @router.post("/", response_model=AgentUserResponse, status_code=status.HTTP_201_CREATED)
 async def add_agent_user(
     agent_user_data: AgentUserCreate,
@@ -53,31 +59,34 @@ async def add_agent_user(
     # model_validate is Pydantic V2
     return AgentUserResponse.model_validate(created_user)
 
-@router.get("/{email}")
+# Email lookups live under /by-email/ so they never collide with GET /{agent_user_id}
+EMAIL_PATH_PATTERN = r"^[^@\s/]+@[^@\s/]+$"
+
+@router.get("/by-email/{email}")
 async def get_user_id_by_email(
-    email: EmailStr,
+    email: EmailStr = Path(..., pattern=EMAIL_PATH_PATTERN),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
-    Get the user ID (MongoDB document ID) for a given email.
+    Get the user ID (uid) for a given email.
     """
-    user = await get_agent_user_by_email(email, db)
+    user = await get_agent_user_fields_by_email(email, ["uid"], db)
     if not user:
         raise HTTPException(status_code=404, detail=f"User with email '{email}' not found.")
-    return {"id": user.uid}
+    return {"id": user.get("uid")}
 
-@router.get("/groq/{email}")
-async def get_user_id_by_email(
-    email: EmailStr,
+@router.get("/by-email/{email}/groq")
+async def get_groq_api_by_email(
+    email: EmailStr = Path(..., pattern=EMAIL_PATH_PATTERN),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
-    Get the user ID (MongoDB document ID) for a given email.
+    Get the GROQ API key for a given email.
     """
-    user = await get_agent_user_by_email(email, db)
+    user = await get_agent_user_fields_by_email(email, ["groq_api"], db)
     if not user:
         raise HTTPException(status_code=404, detail=f"User with email '{email}' not found.")
-    return {"id": user.groq_api}
+    return {"id": user.get("groq_api")}
 
 
 @router.get("/{agent_user_id}", response_model=AgentUserResponse)
@@ -107,25 +116,14 @@ async def read_agent_user_by_uid_route(
     return AgentUserResponse.model_validate(agent_user)
 
 
-@router.get("/", response_model=List[AgentUserResponse])
+@router.get("/", response_model=None, responses={200: {"model": List[AgentUserResponse]}})
 async def read_all_agent_users(
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get a list of all agent users with pagination.
     """
-    agent_users = await get_all_agent_users(db)
-    return [AgentUserResponse.model_validate(au) for au in agent_users]
-
-async def get_all_agent_users(db: AsyncIOMotorDatabase):
-    cursor = db["agent_users"].find({})
-    users = await cursor.to_list(length=None)
-
-    # Convert MongoDB _id to string id
-    for user in users:
-        user["id"] = str(user["_id"])
-        del user["_id"]
-    return users
+    return await stream_documents(find_all_agent_users(db, projection=AGENT_USER_PROJECTION), id_field="id")
 
 @router.get("/status/email/{email}", response_model=UserStatus)
 async def read_agent_user_status_by_email(
@@ -146,6 +144,22 @@ async def read_agent_user_status_by_email(
         )
     return user_status
 
+@router.get("/profile/{email}", response_model=AgentUserProfile)
+async def read_agent_user_profile_by_email(
+    email: EmailStr,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """
+    Get the uid, status and GROQ API key for a user by email in a single call.
+    """
+    user = await get_agent_user_fields_by_email(email, ["uid", "status", "groq_api"], db)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Agent user with email '{email}' not found."
+        )
+    return AgentUserProfile(**user)
+
 @router.put("/{agent_user_id}/groq_api", response_model=AgentUserResponse)
 async def update_agent_user_groq_api_endpoint(
     agent_user_id: str,
@@ -1,19 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Path, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Path, Query, Header, Response
 from typing import List, Optional
 from bson import ObjectId
 from pymongo import ReturnDocument
 
-from ..models.gittask import GitHubTaskCreate, GitHubTaskInDB
-from ..db.mongodb import get_database
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..utils.dependencies import validate_object_id_sync
+from ..models.gittask import GitHubTaskCreate, GitHubTaskInDB, GitHubTaskIdResponse
+from ..models.base import model_projection
+from ..db.collections import get_collection, delete_by_id, TOUCH_UPDATED_AT, current_etag
+from ..db.loaders import loader_dependency
+from ..utils.dependencies import validate_object_id_sync, OBJECT_ID_PATTERN
+from ..utils.responses import stream_documents, prefers_minimal, document_etag, set_etag, etag_matches, not_modified
 
 
 router = APIRouter()
 
-async def get_gittask_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+# Only the fields GitHubTaskInDB exposes, so extra stored fields never cross the wire
+GIT_TASK_PROJECTION = model_projection(GitHubTaskInDB)
+get_github_task_loader = loader_dependency("github_tasks", {**GIT_TASK_PROJECTION, "updated_at": 1})
+
+async def get_gittask_collection():
     """Dependency to get the 'github_tasks' collection."""
-    return db.get_collection("github_tasks")
+    return get_collection("github_tasks")
 
 @router.post("/", response_model=GitHubTaskInDB, status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
 async def create_gittask(
@@ -24,62 +30,75 @@ async def create_gittask(
     try:
         github_task_dict = github_task.model_dump()
         insert_result = await collection.insert_one(github_task_dict)
-        created_github_task = await collection.find_one({"_id": insert_result.inserted_id})
-        if created_github_task:
-            return GitHubTaskInDB(**created_github_task)
+        if insert_result.inserted_id:
+            github_task_dict["_id"] = insert_result.inserted_id
+            return GitHubTaskInDB.model_construct(**github_task_dict)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="GitHub task could not be created")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating GitHub task: {e}")
 
-@router.get("/", response_model=List[GitHubTaskInDB], response_model_by_alias=False)
+@router.post("/bulk", response_model=List[GitHubTaskIdResponse], status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
+async def create_gittasks_bulk(
+    items: List[GitHubTaskCreate],
+    collection = Depends(get_gittask_collection)
+):
+    """Creates many GitHub tasks in one insert_many and returns their ids in request order."""
+    if not items:
+        return []
+    try:
+        insert_result = await collection.insert_many([item.model_dump() for item in items], ordered=False)
+        return [GitHubTaskIdResponse.model_construct(git_task_id=oid) for oid in insert_result.inserted_ids]
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating GitHub tasks: {e}")
+
+@router.get("/", response_model=None, responses={200: {"model": List[GitHubTaskInDB]}})
 async def read__all_gittasks(
     status: Optional[str] = Query(None, description="Filter tasks by status (e.g., pending, in_progress, completed)"),
     collection = Depends(get_gittask_collection)
 ):
     """Retrieves all GitHub tasks, optionally filtered by status."""
     query = {"status": status} if status else {}
-    github_tasks_cursor = collection.find(query)
-    github_tasks = await github_tasks_cursor.to_list(length=None)
-    return [GitHubTaskInDB(**gt) for gt in github_tasks]
+    # Stream in batches of 500 instead of buffering the whole result set
+    github_tasks_cursor = collection.find(query, GIT_TASK_PROJECTION, batch_size=500)
+    return await stream_documents(github_tasks_cursor, id_field="git_task_id")
 
 @router.get("/{git_task_id}", response_model=GitHubTaskInDB, response_model_by_alias=False)
 async def read_gittask_by_id(
-    git_task_id: str = Path(..., description="The BSON ObjectId of the GitHub task as a string"),
-    collection = Depends(get_gittask_collection)
+    response: Response,
+    git_task_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the GitHub task as a string"),
+    if_none_match: Optional[str] = Header(None),
+    loader = Depends(get_github_task_loader)
 ):
     """Retrieves a specific GitHub task by ID."""
     validated_github_task_oid = validate_object_id_sync(git_task_id)
-    github_task = await collection.find_one({"_id": validated_github_task_oid})
+    # Revalidation only needs updated_at, not the whole document
+    if if_none_match:
+        etag = await current_etag("github_tasks", validated_github_task_oid)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    github_task = await loader.load(validated_github_task_oid)
     if github_task:
+        set_etag(response, document_etag(validated_github_task_oid, github_task.get("updated_at")))
         return GitHubTaskInDB(**github_task)
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"GitHub task with id {git_task_id} not found")
 
-@router.get("/by_status/{status}", response_model=List[GitHubTaskInDB], response_model_by_alias=False)
+@router.get("/by_status/{status}", response_model=None, responses={200: {"model": List[GitHubTaskInDB]}})
 async def read_gittasks_by_status(
     status: str = Path(..., description="The status of the GitHub tasks to retrieve (e.g., 'pending', 'precessed')"),
     collection = Depends(get_gittask_collection)
 ):
     """Retrieves all GitHub tasks by their status."""
-   
-    try:
-        # Query the database for tasks with the given status
-        query = {"status": status}
-        tasks_cursor = collection.find(query)
-        tasks_list = await tasks_cursor.to_list(length=None)  # Fetch all tasks with the specified status
-        # Return the list of tasks
-        return [GitHubTaskInDB(**task) for task in tasks_list]
-
-    except Exception as e:
-        # Handle unexpected errors
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An error occurred while retrieving tasks with status '{status}': {e}"
-        )
+    # Query the database for tasks with the given status
+    query = {"status": status}
+    tasks_cursor = collection.find(query, GIT_TASK_PROJECTION, batch_size=500)
+    # Stream the stored documents as JSON directly
+    return await stream_documents(tasks_cursor, id_field="git_task_id")
     
-@router.put("/{git_task_id}", response_model=GitHubTaskInDB, response_model_by_alias=False)
+@router.put("/{git_task_id}", response_model=GitHubTaskInDB, response_model_by_alias=False, responses={204: {"description": "Updated; returned instead of the document for Prefer: return=minimal"}})
 async def update_gittask(
     github_task_update: GitHubTaskCreate,
-    git_task_id: str = Path(..., description="The BSON ObjectId of the GitHub task as a string"),
+    git_task_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the GitHub task as a string"),
+    prefer: Optional[str] = Header(None),
     collection = Depends(get_gittask_collection)
 ):
     """Updates an existing GitHub task."""
@@ -88,28 +107,33 @@ async def update_gittask(
     if not github_task_dict:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided")
 
-    updated_github_task = await collection.find_one_and_update(
+    if prefers_minimal(prefer):
+        # Plain update: nothing is read back from the server
+        update_result = await collection.update_one({"_id": validated_github_task_oid}, {"$set": github_task_dict, **TOUCH_UPDATED_AT})
+        if update_result.matched_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"GitHub task with id {git_task_id} not found for update")
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    previous = await collection.find_one_and_update(
         {"_id": validated_github_task_oid},
-        {"$set": github_task_dict},
-        return_document=ReturnDocument.AFTER
+        {"$set": github_task_dict, **TOUCH_UPDATED_AT},
+        return_document=ReturnDocument.BEFORE
     )
-    if updated_github_task:
-        return GitHubTaskInDB(**updated_github_task)
+    if previous:
+        return GitHubTaskInDB.model_construct(**{**previous, **github_task_dict})
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"GitHub task with id {git_task_id} not found for update")
 
 @router.delete("/{git_task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_gittask(
-    git_task_id: str = Path(..., description="The BSON ObjectId of the GitHub task as a string"),
-    collection = Depends(get_gittask_collection)
+    git_task_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the GitHub task as a string")
 ):
     """Deletes a GitHub task."""
     validated_github_task_oid = validate_object_id_sync(git_task_id)
-    delete_result = await collection.delete_one({"_id": validated_github_task_oid})
-    if delete_result.deleted_count == 0:
+    if not await delete_by_id("github_tasks", validated_github_task_oid, comment="delete_gittask"):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"GitHub task with id {git_task_id} not found for deletion")
     return
 
-@router.get("/by_message/{mid}", response_model=List[GitHubTaskInDB], response_model_by_alias=False)
+@router.get("/by_message/{mid}", response_model=None, responses={200: {"model": List[GitHubTaskInDB]}})
 async def read_gittasks_by_message_id(
     mid: str = Path(..., description="The string representation of the message ID (mid)"),
     collection = Depends(get_gittask_collection)
@@ -119,16 +143,5 @@ async def read_gittasks_by_message_id(
 
     # Query by the 'mid' field as a STRING
     query = {"mid": mid} # Use the input string directly
-    tasks_cursor = collection.find(query)
-    tasks_list = await tasks_cursor.to_list(length=None) # Fetch all
-
-    # Basic validation - consider more robust error handling if needed
-    try:
-        # The tasks retrieved should still conform to GitHubTaskInDB for the response
-        return [GitHubTaskInDB(**task) for task in tasks_list]
-    except Exception as e:
-        # Handle potential validation errors if DB data doesn't match model
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error validating GitHub task data for message {mid}: {e}"
-        )
+    tasks_cursor = collection.find(query, GIT_TASK_PROJECTION, sort=[("_id", 1)], batch_size=500)
+    return await stream_documents(tasks_cursor, id_field="git_task_id")
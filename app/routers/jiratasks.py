@@ -1,18 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Path, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Path, Query, Header, Response
 from typing import List, Optional
 from bson import ObjectId
 from pymongo import ReturnDocument
 
-from ..models.jiratask import JiraTaskCreate, JiraTaskInDB
-from ..db.mongodb import get_database
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..utils.dependencies import validate_object_id_sync
+from ..models.jiratask import JiraTaskCreate, JiraTaskInDB, JiraTaskIdResponse
+from ..models.base import model_projection
+from ..db.collections import get_collection, delete_by_id, TOUCH_UPDATED_AT, current_etag
+from ..db.loaders import loader_dependency
+from ..utils.dependencies import validate_object_id_sync, OBJECT_ID_PATTERN
+from ..utils.responses import stream_documents, prefers_minimal, document_etag, set_etag, etag_matches, not_modified
 
 router = APIRouter()
 
-async def get_jiratask_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+JIRA_TASK_PROJECTION = model_projection(JiraTaskInDB)
+get_jiratask_loader = loader_dependency("jira_tasks", {**JIRA_TASK_PROJECTION, "updated_at": 1})
+
+async def get_jiratask_collection():
     """Dependency to get the 'jira_tasks' collection."""
-    return db.get_collection("jira_tasks")
+    return get_collection("jira_tasks")
 
 @router.post("/", response_model=JiraTaskInDB, status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
 async def create_jiratask(
@@ -23,14 +28,29 @@ async def create_jiratask(
     try:
         jira_task_dict = jira_task.model_dump()
         insert_result = await collection.insert_one(jira_task_dict)
-        created_jira_task = await collection.find_one({"_id": insert_result.inserted_id})
-        if created_jira_task:
-            return JiraTaskInDB(**created_jira_task)
+        if insert_result.inserted_id:
+            # The stored document is exactly what we sent plus its _id; no need to read it back
+            jira_task_dict["_id"] = insert_result.inserted_id
+            return JiraTaskInDB.model_construct(**jira_task_dict)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Jira task could not be created")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating Jira task: {e}")
 
-@router.get("/", response_model=List[JiraTaskInDB], response_model_by_alias=False)
+@router.post("/bulk", response_model=List[JiraTaskIdResponse], status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
+async def create_jiratasks_bulk(
+    items: List[JiraTaskCreate],
+    collection = Depends(get_jiratask_collection)
+):
+    """Creates many Jira tasks in one insert_many and returns their ids in request order."""
+    if not items:
+        return []
+    try:
+        insert_result = await collection.insert_many([item.model_dump() for item in items], ordered=False)
+        return [JiraTaskIdResponse.model_construct(jira_task_id=oid) for oid in insert_result.inserted_ids]
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating Jira tasks: {e}")
+
+@router.get("/", response_model=None, responses={200: {"model": List[JiraTaskInDB]}})
 async def read_all_jiratasks(
     status: Optional[str] = Query(None, description="Filter by task status"),
     collection = Depends(get_jiratask_collection)
@@ -39,48 +59,47 @@ async def read_all_jiratasks(
     query = {}
     if status:
         query["status"] = status
-    jiratasks_cursor = collection.find(query)
-    jiratasks = await jiratasks_cursor.to_list(length=None)  # Fetch matching Jira tasks
-    return [JiraTaskInDB(**jt) for jt in jiratasks]
+    # Stream in batches of 500 instead of buffering the whole result set
+    jiratasks_cursor = collection.find(query, JIRA_TASK_PROJECTION, batch_size=500)
+    return await stream_documents(jiratasks_cursor, id_field="jira_task_id")
 
 @router.get("/{jira_task_id}", response_model=JiraTaskInDB, response_model_by_alias=False)
 async def read_jiratask_by_id(
-    jira_task_id: str = Path(..., description="The BSON ObjectId of the Jira task as a string"),
-    collection = Depends(get_jiratask_collection)
+    response: Response,
+    jira_task_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the Jira task as a string"),
+    if_none_match: Optional[str] = Header(None),
+    loader = Depends(get_jiratask_loader)
 ):
     """Retrieves a specific Jira task by ID."""
     validated_jiratask_oid = validate_object_id_sync(jira_task_id)
-    jiratask = await collection.find_one({"_id": validated_jiratask_oid})
+    if if_none_match:
+        etag = await current_etag("jira_tasks", validated_jiratask_oid)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    jiratask = await loader.load(validated_jiratask_oid)
     if jiratask:
+        set_etag(response, document_etag(validated_jiratask_oid, jiratask.get("updated_at")))
         return JiraTaskInDB(**jiratask)
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Jira task with id {jira_task_id} not found")
 
-@router.get("/by_status/{status}", response_model=List[JiraTaskInDB], response_model_by_alias=False)
+@router.get("/by_status/{status}", response_model=None, responses={200: {"model": List[JiraTaskInDB]}})
 async def read_jiratasks_by_status(
     status: str = Path(..., description="The status of the Jira tasks to retrieve (e.g., 'pending', 'precessed')"),
     collection = Depends(get_jiratask_collection)
 ):
     """Retrieves all Jira tasks by their status."""
-   
-    try:
-        # Query the database for tasks with the given status
-        query = {"status": status}
-        tasks_cursor = collection.find(query)
-        tasks_list = await tasks_cursor.to_list(length=None)  # Fetch all tasks with the specified status
-        # Return the list of tasks
-        return [JiraTaskInDB(**task) for task in tasks_list]
+    # Query the database for tasks with the given status
+    query = {"status": status}
+    tasks_cursor = collection.find(query, JIRA_TASK_PROJECTION, batch_size=500)
+    # Stream the stored documents as JSON directly
+    return await stream_documents(tasks_cursor, id_field="jira_task_id")
 
-    except Exception as e:
-        # Handle unexpected errors
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An error occurred while retrieving tasks with status '{status}': {e}"
-        )
     
-@router.put("/{jira_task_id}", response_model=JiraTaskInDB, response_model_by_alias=False)
+@router.put("/{jira_task_id}", response_model=JiraTaskInDB, response_model_by_alias=False, responses={204: {"description": "Updated; returned instead of the document for Prefer: return=minimal"}})
 async def update_jiratask(
     jira_task_update: JiraTaskCreate,
-    jira_task_id: str = Path(..., description="The BSON ObjectId of the Jira task as a string"),
+    jira_task_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the Jira task as a string"),
+    prefer: Optional[str] = Header(None),
     collection = Depends(get_jiratask_collection)
 ):
     """Updates an existing Jira task."""
@@ -89,28 +108,32 @@ async def update_jiratask(
     if not jiratask_dict:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided")
 
-    updated_jiratask = await collection.find_one_and_update(
+    if prefers_minimal(prefer):
+        update_result = await collection.update_one({"_id": validated_jiratask_oid}, {"$set": jiratask_dict, **TOUCH_UPDATED_AT})
+        if update_result.matched_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Jira task with id {jira_task_id} not found for update")
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    previous = await collection.find_one_and_update(
         {"_id": validated_jiratask_oid},
-        {"$set": jiratask_dict},
-        return_document=ReturnDocument.AFTER
+        {"$set": jiratask_dict, **TOUCH_UPDATED_AT},
+        return_document=ReturnDocument.BEFORE
     )
-    if updated_jiratask:
-        return JiraTaskInDB(**updated_jiratask)
+    if previous:
+        return JiraTaskInDB.model_construct(**{**previous, **jiratask_dict})
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Jira task with id {jira_task_id} not found for update")
 
 @router.delete("/{jira_task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_jiratask(
-    jira_task_id: str = Path(..., description="The BSON ObjectId of the Jira task as a string"),
-    collection = Depends(get_jiratask_collection)
+    jira_task_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the Jira task as a string")
 ):
     """Deletes a Jira task."""
     validated_jiratask_oid = validate_object_id_sync(jira_task_id)
-    delete_result = await collection.delete_one({"_id": validated_jiratask_oid})
-    if delete_result.deleted_count == 0:
+    if not await delete_by_id("jira_tasks", validated_jiratask_oid, comment="delete_jiratask"):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Jira task with id {jira_task_id} not found for deletion")
     return
 
-@router.get("/by_message/{mid}", response_model=List[JiraTaskInDB], response_model_by_alias=False)
+@router.get("/by_message/{mid}", response_model=None, responses={200: {"model": List[JiraTaskInDB]}})
 async def read_jiratasks_by_message_id(
     mid: str = Path(..., description="The string representation of the message ID (mid)"),
     collection = Depends(get_jiratask_collection)
@@ -120,16 +143,5 @@ async def read_jiratasks_by_message_id(
 
     # Query by the 'mid' field as a STRING
     query = {"mid": mid} # Use the input string directly
-    tasks_cursor = collection.find(query)
-    tasks_list = await tasks_cursor.to_list(length=None) # Fetch all
-
-    # Basic validation - consider more robust error handling if needed
-    try:
-        # The tasks retrieved should still conform to JiraTaskInDB for the response
-        return [JiraTaskInDB(**task) for task in tasks_list]
-    except Exception as e:
-        # Handle potential validation errors if DB data doesn't match model
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error validating Jira task data for message {mid}: {e}"
-        )
+    tasks_cursor = collection.find(query, JIRA_TASK_PROJECTION, sort=[("_id", 1)], batch_size=500)
+    return await stream_documents(tasks_cursor, id_field="jira_task_id")
@@ -1,18 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Path
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, status, Path, Header, Response
+from typing import List, Optional
 from bson import ObjectId
 from pymongo import ReturnDocument
 
-from ..models.meeting import MeetingCreate, MeetingInDB # Import Meeting models
-from ..db.mongodb import get_database
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..utils.dependencies import validate_object_id_sync
+from ..models.meeting import MeetingCreate, MeetingInDB, MeetingIdResponse # Import Meeting models
+from ..models.base import model_projection
+from ..db.collections import get_collection, delete_by_id, TOUCH_UPDATED_AT, current_etag
+from ..db.loaders import loader_dependency
+from ..utils.dependencies import validate_object_id_sync, OBJECT_ID_PATTERN
+from ..utils.responses import stream_documents, prefers_minimal, document_etag, set_etag, etag_matches, not_modified
 
 router = APIRouter()
 
-async def get_meeting_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+MEETING_PROJECTION = model_projection(MeetingInDB)
+get_meeting_loader = loader_dependency("meetings", {**MEETING_PROJECTION, "updated_at": 1})
+
+async def get_meeting_collection():
     """Dependency to get the 'meetings' collection."""
-    return db.get_collection("meetings")
+    return get_collection("meetings")
 
 @router.post("/", response_model=MeetingInDB, status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
 async def create_meeting(
@@ -26,40 +31,60 @@ async def create_meeting(
 
         # Insert the dictionary. It now contains the 'mid' passed in the request.
         insert_result = await collection.insert_one(meeting_dict)
-        # Fetch using the MongoDB-generated _id
-        created_meeting = await collection.find_one({"_id": insert_result.inserted_id})
-        if created_meeting:
-            # Pydantic maps _id to meet_id and includes mid from DB record
-            return MeetingInDB(**created_meeting)
+        if insert_result.inserted_id:
+            # Echo the inserted dict with the generated _id; Pydantic maps _id to meet_id
+            meeting_dict["_id"] = insert_result.inserted_id
+            return MeetingInDB.model_construct(**meeting_dict)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Meeting could not be created")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating meeting: {e}")
 
-@router.get("/", response_model=List[MeetingInDB], response_model_by_alias=False)
+@router.post("/bulk", response_model=List[MeetingIdResponse], status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
+async def create_meetings_bulk(
+    items: List[MeetingCreate],
+    collection = Depends(get_meeting_collection)
+):
+    """Creates many meetings in one insert_many and returns their ids in request order."""
+    if not items:
+        return []
+    try:
+        insert_result = await collection.insert_many([item.model_dump() for item in items], ordered=False)
+        return [MeetingIdResponse.model_construct(meet_id=oid) for oid in insert_result.inserted_ids]
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating meetings: {e}")
+
+@router.get("/", response_model=None, responses={200: {"model": List[MeetingInDB]}})
 async def read_all_meetings(
     collection = Depends(get_meeting_collection)
 ):
     """Retrieves all meetings."""
-    meetings_cursor = collection.find()
-    meetings = await meetings_cursor.to_list(length=None)  # Fetch all meetings
-    return [MeetingInDB(**meeting) for meeting in meetings]
+    meetings_cursor = collection.find({}, MEETING_PROJECTION, batch_size=500)
+    return await stream_documents(meetings_cursor, id_field="meet_id")
 
 @router.get("/{meet_id}", response_model=MeetingInDB, response_model_by_alias=False)
 async def read_meeting_by_id(
-    meet_id: str = Path(..., description="The BSON ObjectId of the meeting (meet_id) as a string"),
-    collection = Depends(get_meeting_collection)
+    response: Response,
+    meet_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the meeting (meet_id) as a string"),
+    if_none_match: Optional[str] = Header(None),
+    loader = Depends(get_meeting_loader)
 ):
     """Retrieves a specific meeting by ID (meet_id)."""
     validated_meet_oid = validate_object_id_sync(meet_id)
-    meeting = await collection.find_one({"_id": validated_meet_oid})
+    if if_none_match:
+        etag = await current_etag("meetings", validated_meet_oid)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    meeting = await loader.load(validated_meet_oid)
     if meeting:
+        set_etag(response, document_etag(validated_meet_oid, meeting.get("updated_at")))
         return MeetingInDB(**meeting)
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Meeting with meet_id {meet_id} not found")
 
-@router.put("/{meet_id}", response_model=MeetingInDB, response_model_by_alias=False)
+@router.put("/{meet_id}", response_model=MeetingInDB, response_model_by_alias=False, responses={204: {"description": "Updated; returned instead of the document for Prefer: return=minimal"}})
 async def update_meeting(
     meeting_update: MeetingCreate,
-    meet_id: str = Path(..., description="The BSON ObjectId of the meeting (meet_id) as a string"),
+    meet_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the meeting (meet_id) as a string"),
+    prefer: Optional[str] = Header(None),
     collection = Depends(get_meeting_collection)
 ):
     """Updates an existing meeting (excluding mid)."""
@@ -68,23 +93,27 @@ async def update_meeting(
     if not meeting_dict:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided")
 
-    updated_meeting = await collection.find_one_and_update(
+    if prefers_minimal(prefer):
+        update_result = await collection.update_one({"_id": validated_meet_oid}, {"$set": meeting_dict, **TOUCH_UPDATED_AT})
+        if update_result.matched_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Meeting with meet_id {meet_id} not found for update")
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    previous = await collection.find_one_and_update(
         {"_id": validated_meet_oid},
-        {"$set": meeting_dict},
-        return_document=ReturnDocument.AFTER
+        {"$set": meeting_dict, **TOUCH_UPDATED_AT},
+        return_document=ReturnDocument.BEFORE
     )
-    if updated_meeting:
-        return MeetingInDB(**updated_meeting)
+    if previous:
+        return MeetingInDB.model_construct(**{**previous, **meeting_dict})
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Meeting with meet_id {meet_id} not found for update")
 
 @router.delete("/{meet_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_meeting(
-    meet_id: str = Path(..., description="The BSON ObjectId of the meeting (meet_id) as a string"),
-    collection = Depends(get_meeting_collection)
+    meet_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the meeting (meet_id) as a string")
 ):
     """Deletes a meeting."""
     validated_meet_oid = validate_object_id_sync(meet_id)
-    delete_result = await collection.delete_one({"_id": validated_meet_oid})
-    if delete_result.deleted_count == 0:
+    if not await delete_by_id("meetings", validated_meet_oid, comment="delete_meeting"):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Meeting with meet_id {meet_id} not found for deletion")
     return
@@ -1,19 +1,54 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Path, Query
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, status, Path, Query, Header, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from pydantic import TypeAdapter
+import hashlib
+import orjson
+from datetime import datetime, timedelta, timezone
 from bson import ObjectId
-from pymongo import ReturnDocument
+from pymongo import ReturnDocument, ASCENDING, DESCENDING, UpdateOne
 
-from ..models.message import MessageCreate, MessageInDB, MessageMidResponse, MessageContentReply # Import Message models
-from ..db.mongodb import get_database
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..utils.dependencies import validate_object_id_sync
-from ..models.base import PyObjectId # Import PyObjectId for response model
+from ..models.message import MessageCreate, MessageInDB, MessageMidResponse, MessageContentReply, MessageBulkUpdateItem, MessageReplyTarget, MessageStatusPatch, MessageStatusUpdate, MessageClaimRequest # Import Message models
+from ..db.collections import get_collection, delete_by_id, TOUCH_UPDATED_AT, current_etag
+from ..db.loaders import loader_dependency
+from ..utils.dependencies import validate_object_id_sync, OBJECT_ID_PATTERN
+from ..models.base import PyObjectId, model_projection # Import PyObjectId for response model
+from ..utils.responses import documents_response, prefers_minimal, document_etag, set_etag, etag_matches, not_modified
 
 router = APIRouter()
 
-async def get_message_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+# Built once at import and reused by every GET / response
+_CONTENT_REPLY_LIST = TypeAdapter(List[MessageContentReply])
+# Stored fields MessageInDB exposes; claim bookkeeping and anything else stays on the server
+MESSAGE_PROJECTION = model_projection(MessageInDB)
+get_message_loader = loader_dependency("messages", {**MESSAGE_PROJECTION, "updated_at": 1})
+
+# Fields a history caller may ask for through the `fields` query parameter
+HISTORY_FIELDS = frozenset({"content", "reply", "username", "message_datetime", "channel"})
+# Fields the reply worker may ask for from /by_status/full/ and /claimable/
+REPLY_TARGET_FIELDS = frozenset({"msg_id", "source", "channel", "channel_id", "thread_ts", "reply"})
+# A claim older than this is treated as abandoned (its worker died) and can be taken again
+CLAIM_LEASE_SECONDS = 600
+
+def _claimable_filter() -> dict:
+    """Messages a reply run may claim: processed ones, due deferrals, and claims whose lease ran out."""
+    now = datetime.now(timezone.utc)
+    lease_cutoff = now - timedelta(seconds=CLAIM_LEASE_SECONDS)
+    return {"$or": [
+        {"status": "processed"},
+        # Throttled replies wait out their Retry-After before anyone may claim them again
+        {"status": "deferred", "retry_at": {"$lte": now}},
+        # A missing claimed_at means the claim predates leases, so it counts as expired too
+        {"status": "sending", "claimed_at": {"$not": {"$gte": lease_cutoff}}},
+    ]}
+
+def _claim_guard(claim_id: Optional[str]) -> dict:
+    """Extra filter so a status write from a reply run only lands while its claim still holds."""
+    return {"claim_id": claim_id, "status": "sending"} if claim_id else {}
+
+async def get_message_collection():
     """Dependency to get the 'messages' collection."""
-    return db.get_collection("messages")
+    return get_collection("messages")
 
 @router.post("/", response_model=MessageMidResponse, status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
 async def create_message(
@@ -31,6 +66,20 @@ async def create_message(
         # Consider more specific error handling based on validation etc.
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating message: {e}")
 
+@router.post("/bulk", response_model=List[MessageMidResponse], status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
+async def create_messages_bulk(
+    messages: List[MessageCreate],
+    collection = Depends(get_message_collection)
+):
+    """Creates many messages in one unordered insert_many and returns their mids in request order."""
+    if not messages:
+        return []
+    try:
+        insert_result = await collection.insert_many([message.model_dump() for message in messages], ordered=False)
+        return [MessageMidResponse.model_construct(mid=oid) for oid in insert_result.inserted_ids]
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating messages: {e}")
+
 # @router.get("/", response_model=List[MessageContentReply], response_model_by_alias=False)
 # async def read_all_messages(
 #     collection = Depends(get_message_collection)
@@ -50,12 +99,20 @@ async def create_message(
 #     return [MessageContentReply(**msg) for msg in messages_data]
 
 
-@router.get("/", response_model=List[MessageContentReply], response_model_by_alias=False)
+@router.get("/", response_model=None, responses={200: {"model": List[MessageContentReply]}})
 async def read_messages_by_uid(
     uid: str = Query(None, description="User ID to filter messages"),
+    since: Optional[datetime] = Query(None, description="Only return messages sent at or after this time (ISO format)"),
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$", description="Sort by message_datetime ('asc' or 'desc')"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of messages to return"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return: content, reply, username, message_datetime, channel"),
+    if_none_match: Optional[str] = Header(None),
     collection = Depends(get_message_collection)
 ):
-    """Retrieves messages by UID if provided; otherwise returns all messages."""
+    """
+    Retrieves messages by UID if provided; otherwise returns all messages.
+    Responses carry an ETag; a matching If-None-Match returns 304 with no body.
+    """
     
     projection = {
         "content": 1,
@@ -63,12 +120,43 @@ async def read_messages_by_uid(
         "uid": 1,  # Include UID in the response
 
     }
+    if fields:
+        requested = {f.strip() for f in fields.split(",")}
+        unknown = requested - HISTORY_FIELDS
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        projection = {f: 1 for f in requested | {"content"}}
 
     query_filter = {"uid": uid} if uid else {}
+    if since:
+        query_filter["message_datetime"] = {"$gte": since}
+
+    # The tag comes from a count/max summary of the matching documents, so a 304 skips
+    # fetching and serializing them. Every message write touches updated_at, and inserts
+    # and deletes move the count or max _id. `since` is left out of the key: it shifts on
+    # every call, and a message leaving the window already changes the count.
+    summary = await collection.aggregate([
+        {"$match": query_filter},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "updated_at": {"$max": "$updated_at"}, "last_id": {"$max": "$_id"}}},
+    ]).to_list(length=1)
+    summary = summary[0] if summary else {}
+    version = (sorted(projection), uid, order, limit, summary.get("count", 0), summary.get("updated_at"), summary.get("last_id"))
+    etag = f'W/"{hashlib.sha1(repr(version).encode()).hexdigest()}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
 
     messages_cursor = collection.find(query_filter, projection)
+    if order:
+        messages_cursor = messages_cursor.sort("message_datetime", DESCENDING if order == "desc" else ASCENDING)
+    if limit:
+        messages_cursor = messages_cursor.limit(limit)
     messages_data = await messages_cursor.to_list(length=None)
-    return [MessageContentReply(**msg) for msg in messages_data]
+    # One prebuilt adapter serializes the whole list in Rust; unset fields are left out as before
+    body = _CONTENT_REPLY_LIST.dump_json(
+        [MessageContentReply.model_construct(**msg) for msg in messages_data],
+        exclude_unset=True
+    )
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 # New endpoint to get messages by status
 @router.get("/by_status/", response_model=List[MessageMidResponse], response_model_by_alias=False)
@@ -88,6 +176,55 @@ async def read_messages_by_status(
             detail=f"Error validating message data from DB: {e}"
         )
 
+async def _ndjson_reply_targets(cursor):
+    """Yield each reply target as one JSON line, mid as a string."""
+    async for doc in cursor:
+        doc["mid"] = str(doc.pop("_id"))
+        yield orjson.dumps(doc) + b"\n"
+
+# Declared before /{mid}; returns the reply fields so callers don't fetch each message
+@router.get("/by_status/full/", response_model=List[MessageReplyTarget], response_model_by_alias=False, response_model_exclude_unset=True)
+async def read_messages_by_status_full(
+    status: str = Query(..., description="The status value to filter messages by (e.g., 'processed')"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return besides mid: msg_id, source, channel, channel_id, thread_ts, reply"),
+    accept: Optional[str] = Header(None),
+    collection = Depends(get_message_collection)
+):
+    """
+    Retrieves the reply-relevant fields of every message with the given status in one query.
+    With `Accept: application/x-ndjson` the documents are streamed one per line as the cursor yields them.
+    """
+    return await _reply_targets(collection, {"status": status}, fields, accept)
+
+# Declared before /{mid}; what the reply worker lists and then claims
+@router.get("/claimable/", response_model=List[MessageReplyTarget], response_model_by_alias=False, response_model_exclude_unset=True)
+async def read_claimable_messages(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return besides mid: msg_id, source, channel, channel_id, thread_ts, reply"),
+    accept: Optional[str] = Header(None),
+    collection = Depends(get_message_collection)
+):
+    """
+    Like /by_status/full/?status=processed, but also returns deferred messages whose
+    retry_at has passed and messages left in 'sending' by a reply run whose claim lease
+    expired, so a crashed worker doesn't strand them.
+    """
+    return await _reply_targets(collection, _claimable_filter(), fields, accept)
+
+async def _reply_targets(collection, query: dict, fields: Optional[str], accept: Optional[str]):
+    """Shared body of the reply-target listings: validates `fields`, then returns or streams the matches."""
+    requested = REPLY_TARGET_FIELDS
+    if fields:
+        requested = {f.strip() for f in fields.split(",")}
+        unknown = requested - REPLY_TARGET_FIELDS
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    projection = {"_id": 1, **{f: 1 for f in requested}}
+    cursor = collection.find(query, projection)
+    if accept and "application/x-ndjson" in accept:
+        return StreamingResponse(_ndjson_reply_targets(cursor), media_type="application/x-ndjson")
+    messages = await cursor.to_list(length=None)
+    return [MessageReplyTarget.model_construct(**msg) for msg in messages]
+
 # Endpoint to get messages by PID
 @router.get("/by_pid/", response_model=List[PyObjectId], response_model_by_alias=False)
 async def read_message_ids_by_pid(
@@ -109,7 +246,7 @@ async def read_message_ids_by_pid(
 
     return message_ids
 
-@router.get("/by_processed_status/", response_model=List[MessageInDB], response_model_by_alias=False)
+@router.get("/by_processed_status/", response_model=None, responses={200: {"model": List[MessageInDB]}})
 async def read_messages_by_processed_status(
     processed_status: bool = Query(..., description="Filter messages by their 'processed' status (true or false)"),
     collection = Depends(get_message_collection)
@@ -117,26 +254,85 @@ async def read_messages_by_processed_status(
     """Retrieves a list of all messages filtered by the provided 'processed' status."""
     # Use the boolean value from the query parameter
     query = {"processed": processed_status}
-    messages_cursor = collection.find(query)
+    messages_cursor = collection.find(query, MESSAGE_PROJECTION)
     filtered_messages = await messages_cursor.to_list(length=None) # Fetch all
-    try:
-        return [MessageInDB(**msg) for msg in filtered_messages]
-    except Exception as e:
-         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error validating message data from DB: {e}"
+    return documents_response(filtered_messages, id_field="mid")
+
+# Declared before /{mid} so "bulk" isn't captured as a message id
+@router.put("/bulk")
+async def bulk_update_messages(
+    items: List[MessageBulkUpdateItem],
+    collection = Depends(get_message_collection)
+):
+    """Applies many partial message updates in a single bulk write."""
+    operations = []
+    for item in items:
+        update_dict = item.update.model_dump(exclude_unset=True)
+        if update_dict:
+            operations.append(UpdateOne({"_id": validate_object_id_sync(item.mid)}, {"$set": update_dict, **TOUCH_UPDATED_AT}))
+    if not operations:
+        return {"matched": 0, "modified": 0}
+    result = await collection.bulk_write(operations, ordered=False)
+    return {"matched": result.matched_count, "modified": result.modified_count}
+
+@router.patch("/bulk_status")
+async def bulk_update_message_status(
+    patches: List[MessageStatusPatch],
+    collection = Depends(get_message_collection)
+):
+    """
+    Sets status (and optionally processed) on many messages in a single bulk write.
+    Patches carrying a claim_id only apply to messages that claim still holds.
+    """
+    operations = [
+        UpdateOne(
+            {"_id": validate_object_id_sync(patch.mid), **_claim_guard(patch.claim_id)},
+            {"$set": patch.model_dump(exclude={"mid", "claim_id"}, exclude_none=True), **TOUCH_UPDATED_AT}
         )
+        for patch in patches
+    ]
+    if not operations:
+        return {"matched": 0, "modified": 0}
+    result = await collection.bulk_write(operations, ordered=False)
+    return {"matched": result.matched_count, "modified": result.modified_count}
+
+@router.post("/claim", response_model=List[MessageMidResponse], response_model_by_alias=False)
+async def claim_messages(
+    claim: MessageClaimRequest,
+    collection = Depends(get_message_collection)
+):
+    """
+    Moves the given claimable messages to 'sending' under claim_id and returns the ones
+    this call won. Each document flips atomically, so overlapping callers never share a mid.
+    claimed_at starts the lease; after CLAIM_LEASE_SECONDS another run may take the message over.
+    """
+    oids = [validate_object_id_sync(mid) for mid in claim.mids]
+    if not oids:
+        return []
+    await collection.update_many(
+        {"_id": {"$in": oids}, **_claimable_filter()},
+        {"$set": {"status": "sending", "claim_id": claim.claim_id, "claimed_at": datetime.now(timezone.utc)}, **TOUCH_UPDATED_AT}
+    )
+    claimed = await collection.find({"_id": {"$in": oids}, "claim_id": claim.claim_id, "status": "sending"}, {"_id": 1}).to_list(length=None)
+    return [MessageMidResponse(mid=msg["_id"]) for msg in claimed]
 
 @router.get("/{mid}", response_model=MessageInDB, response_model_by_alias=False)
 async def read_message_by_id(
-    mid: str = Path(..., description="The BSON ObjectId of the message (mid) as a string"),
-    collection = Depends(get_message_collection)
+    response: Response,
+    mid: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the message (mid) as a string"),
+    if_none_match: Optional[str] = Header(None),
+    loader = Depends(get_message_loader)
 ):
     """Retrieves a specific message by ID (mid)."""
     validated_message_oid = validate_object_id_sync(mid)
-    message = await collection.find_one({"_id": validated_message_oid})
+    if if_none_match:
+        etag = await current_etag("messages", validated_message_oid)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    message = await loader.load(validated_message_oid)
     if not message:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Message with mid {mid} not found")
+    set_etag(response, document_etag(validated_message_oid, message.get("updated_at")))
     # Need to handle potential validation errors if data in DB doesn't match model
     try:
         return MessageInDB(**message)
@@ -146,10 +342,11 @@ async def read_message_by_id(
             detail=f"Error validating message data from DB for mid {mid}: {e}"
         )
 
-@router.put("/{mid}", response_model=MessageInDB, response_model_by_alias=False)
+@router.put("/{mid}", response_model=MessageInDB, response_model_by_alias=False, responses={204: {"description": "Updated; returned instead of the document for Prefer: return=minimal"}})
 async def update_message(
     message_update: MessageCreate, # Using MessageCreate allows updating most fields
-    mid: str = Path(..., description="The BSON ObjectId of the message (mid) as a string"),
+    mid: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the message (mid) as a string"),
+    prefer: Optional[str] = Header(None),
     collection = Depends(get_message_collection)
 ):
     """Updates an existing message."""
@@ -159,14 +356,42 @@ async def update_message(
     if not message_dict:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided")
 
-    updated_message = await collection.find_one_and_update(
+    if prefers_minimal(prefer):
+        # Caller doesn't want the document back, so don't have the server return one
+        update_result = await collection.update_one({"_id": validated_message_oid}, {"$set": message_dict, **TOUCH_UPDATED_AT})
+        if update_result.matched_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Message with mid {mid} not found for update")
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    # The pre-image plus our $set is the new document, so it isn't fetched or revalidated again
+    previous = await collection.find_one_and_update(
         {"_id": validated_message_oid},
-        {"$set": message_dict},
+        {"$set": message_dict, **TOUCH_UPDATED_AT},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not previous:
+         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Message with mid {mid} not found for update")
+    return MessageInDB.model_construct(**{**previous, **message_dict})
+
+@router.patch("/{mid}", response_model=MessageInDB, response_model_by_alias=False)
+async def patch_message_status(
+    message_patch: MessageStatusUpdate,
+    mid: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the message (mid) as a string"),
+    collection = Depends(get_message_collection)
+):
+    """Sets status and/or processed on a message without resending the whole document."""
+    validated_message_oid = validate_object_id_sync(mid)
+    patch_dict = message_patch.model_dump(exclude={"claim_id"}, exclude_none=True)
+    if not patch_dict:
+         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided")
+
+    updated_message = await collection.find_one_and_update(
+        {"_id": validated_message_oid, **_claim_guard(message_patch.claim_id)},
+        {"$set": patch_dict, **TOUCH_UPDATED_AT},
         return_document=ReturnDocument.AFTER
     )
     if not updated_message:
-         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Message with mid {mid} not found for update")
-    # Need to handle potential validation errors if data in DB doesn't match model
+         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Message with mid {mid} not found for update (or no longer held by this claim)")
     try:
         return MessageInDB(**updated_message)
     except Exception as e:
@@ -177,12 +402,10 @@ async def update_message(
 
 @router.delete("/{mid}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_message(
-    mid: str = Path(..., description="The BSON ObjectId of the message (mid) as a string"),
-    collection = Depends(get_message_collection)
+    mid: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the message (mid) as a string")
 ):
     """Deletes a message."""
     validated_message_oid = validate_object_id_sync(mid)
-    delete_result = await collection.delete_one({"_id": validated_message_oid})
-    if delete_result.deleted_count == 0:
+    if not await delete_by_id("messages", validated_message_oid, comment="delete_message"):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Message with mid {mid} not found for deletion")
     # No return needed for 204
\ No newline at end of file
@@ -4,15 +4,18 @@ from bson import ObjectId
 from pymongo import ReturnDocument
 
 from ..models.project import ProjectCreate, ProjectInDB # Import Project models
-from ..db.mongodb import get_database
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..utils.dependencies import validate_object_id_sync
+from ..db.collections import get_collection
+from ..models.base import model_projection
+from ..utils.dependencies import validate_object_id_sync, OBJECT_ID_PATTERN
+from ..utils.responses import documents_response
 
 router = APIRouter()
 
-async def get_project_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+PROJECT_PROJECTION = model_projection(ProjectInDB)
+
+async def get_project_collection():
     """Dependency to get the 'projects' collection."""
-    return db.get_collection("projects") # Collection name changed
+    return get_collection("projects") # Collection name changed
 
 @router.post("/", response_model=ProjectInDB, status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
 async def create_project(
@@ -23,25 +26,25 @@ async def create_project(
     try:
         project_dict = project.model_dump()
         insert_result = await collection.insert_one(project_dict)
-        created_project = await collection.find_one({"_id": insert_result.inserted_id})
-        if created_project:
-            return ProjectInDB(**created_project)
+        if insert_result.inserted_id:
+            project_dict["_id"] = insert_result.inserted_id
+            return ProjectInDB.model_construct(**project_dict)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Project could not be created")
     except Exception as e: # Be more specific with exception handling if possible
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating project: {e}")
 
-@router.get("/", response_model=List[ProjectInDB], response_model_by_alias=False)
+@router.get("/", response_model=None, responses={200: {"model": List[ProjectInDB]}})
 async def read_all_projects(
     collection = Depends(get_project_collection)
 ):
     """Retrieves all projects."""
-    projects_cursor = collection.find()
+    projects_cursor = collection.find({}, PROJECT_PROJECTION)
     projects = await projects_cursor.to_list(length=None)  # Fetch all projects
-    return [ProjectInDB(**p) for p in projects]
+    return documents_response(projects, id_field="pid")
 
 @router.get("/{pid}", response_model=ProjectInDB, response_model_by_alias=False)
 async def read_project_by_id(
-    pid: str = Path(..., description="The BSON ObjectId of the project (pid) as a string"),
+    pid: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the project (pid) as a string"),
     collection = Depends(get_project_collection)
 ):
     """Retrieves a specific project by ID (pid)."""
@@ -54,7 +57,7 @@ async def read_project_by_id(
 @router.put("/{pid}", response_model=ProjectInDB, response_model_by_alias=False)
 async def update_project(
     project_update: ProjectCreate,
-    pid: str = Path(..., description="The BSON ObjectId of the project (pid) as a string"),
+    pid: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the project (pid) as a string"),
     collection = Depends(get_project_collection)
 ):
     """Updates an existing project."""
@@ -63,18 +66,18 @@ async def update_project(
     if not project_dict:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided")
 
-    updated_project = await collection.find_one_and_update(
+    previous = await collection.find_one_and_update(  # pre-image; merged with the delta below
         {"_id": validated_project_oid},
         {"$set": project_dict},
-        return_document=ReturnDocument.AFTER
+        return_document=ReturnDocument.BEFORE
     )
-    if updated_project:
-        return ProjectInDB(**updated_project)
+    if previous:
+        return ProjectInDB.model_construct(**{**previous, **project_dict})
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Project with pid {pid} not found for update")
 
 @router.delete("/{pid}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(
-    pid: str = Path(..., description="The BSON ObjectId of the project (pid) as a string"),
+    pid: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the project (pid) as a string"),
     collection = Depends(get_project_collection)
 ):
     """Deletes a project."""
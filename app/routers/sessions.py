@@ -4,15 +4,18 @@ from bson import ObjectId
 from pymongo import ReturnDocument
 
 from ..models.session import SessionCreate, SessionInDB # Import Session models
-from ..db.mongodb import get_database
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..utils.dependencies import validate_object_id_sync
+from ..db.collections import get_collection
+from ..models.base import model_projection
+from ..utils.dependencies import validate_object_id_sync, OBJECT_ID_PATTERN
+from ..utils.responses import documents_response
 
 router = APIRouter()
 
-async def get_session_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+SESSION_PROJECTION = model_projection(SessionInDB)
+
+async def get_session_collection():
     """Dependency to get the 'sessions' collection."""
-    return db.get_collection("sessions")
+    return get_collection("sessions")
 
 @router.post("/", response_model=SessionInDB, status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
 async def create_session(
@@ -23,25 +26,26 @@ async def create_session(
     try:
         session_dict = session.model_dump()
         insert_result = await collection.insert_one(session_dict)
-        created_session = await collection.find_one({"_id": insert_result.inserted_id})
-        if created_session:
-            return SessionInDB(**created_session)
+        if insert_result.inserted_id:
+            # The inserted document is what we just sent plus its new _id; no need to read it back
+            session_dict["_id"] = insert_result.inserted_id
+            return SessionInDB.model_construct(**session_dict)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Session could not be created")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating session: {e}")
 
-@router.get("/", response_model=List[SessionInDB], response_model_by_alias=False)
+@router.get("/", response_model=None, responses={200: {"model": List[SessionInDB]}})
 async def read_all_sessions(
     collection = Depends(get_session_collection)
 ):
     """Retrieves all sessions."""
-    sessions_cursor = collection.find()
+    sessions_cursor = collection.find({}, SESSION_PROJECTION)
     sessions = await sessions_cursor.to_list(length=None)  # Fetch all sessions
-    return [SessionInDB(**session) for session in sessions]
+    return documents_response(sessions, id_field="sid")
 
 @router.get("/{session_id}", response_model=SessionInDB, response_model_by_alias=False)
 async def read_session_by_id(
-    session_id: str = Path(..., description="The BSON ObjectId of the session as a string"),
+    session_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the session as a string"),
     collection = Depends(get_session_collection)
 ):
     """Retrieves a specific session by ID."""
@@ -53,7 +57,7 @@ async def read_session_by_id(
 
 @router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_session(
-    session_id: str = Path(..., description="The BSON ObjectId of the session as a string"),
+    session_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the session as a string"),
     collection = Depends(get_session_collection)
 ):
     """Deletes a session."""
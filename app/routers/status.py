@@ -9,9 +9,11 @@ from ..models.jiratask import JiraTaskInDB
 from ..models.gittask import GitHubTaskInDB
 from ..models.base import PyObjectId
 
-from ..db.mongodb import get_database
-from motor.motor_asyncio import AsyncIOMotorDatabase
 from ..utils.dependencies import validate_object_id_sync
+# Reuse the collection dependencies the owning routers already define
+from .messages import get_message_collection
+from .jiratasks import get_jiratask_collection, JIRA_TASK_PROJECTION
+from .gittasks import get_gittask_collection, GIT_TASK_PROJECTION
 
 # --- Add Logging ---
 import logging
@@ -21,29 +23,6 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-async def get_status_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
-    """Dependency to get the 'status' collection."""
-    # Ensure the collection name matches your desired DB collection name
-    return db.get_collection("status")
-
-async def get_message_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
-    # Ensure this collection name EXACTLY matches your MongoDB collection
-    collection_name = "messages"
-    logger.debug(f"Accessing Messages collection: {collection_name}")
-    return db.get_collection(collection_name)
-
-async def get_jiratask_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
-    # Ensure this collection name EXACTLY matches your MongoDB collection
-    collection_name = "jira_tasks"
-    logger.debug(f"Accessing Jira task collection: {collection_name}")
-    return db.get_collection(collection_name) # Verify this name!
-
-async def get_gittask_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
-    # Ensure this collection name EXACTLY matches your MongoDB collection
-    collection_name = "github_tasks"
-    logger.debug(f"Accessing Git task collection: {collection_name}")
-    return db.get_collection(collection_name) # Verify this name!
-
 @router.get(
     "/{pid}",
     response_model=ProjectStatusDetails,
@@ -106,8 +85,8 @@ async def get_project_status_details(
 
     try:
         # Use the constructed task_query
-        jira_tasks_cursor = jira_collection.find(task_query)
-        git_tasks_cursor = git_collection.find(task_query)
+        jira_tasks_cursor = jira_collection.find(task_query, JIRA_TASK_PROJECTION)
+        git_tasks_cursor = git_collection.find(task_query, GIT_TASK_PROJECTION)
 
         jira_tasks_list_raw = await jira_tasks_cursor.to_list(length=None)
         git_tasks_list_raw = await git_tasks_cursor.to_list(length=None)
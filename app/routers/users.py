@@ -4,15 +4,18 @@ from bson import ObjectId
 from pymongo import ReturnDocument
 
 from ..models.users import UserCreate, UserInDB, UserUidResponse
-from ..db.mongodb import get_database
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..utils.dependencies import validate_object_id_sync
+from ..db.collections import get_collection
+from ..models.base import model_projection
+from ..utils.dependencies import validate_object_id_sync, OBJECT_ID_PATTERN
+from ..utils.responses import documents_response
 
 router = APIRouter()
 
-async def get_user_collection(db: AsyncIOMotorDatabase = Depends(get_database)):
+USER_PROJECTION = model_projection(UserInDB)
+
+async def get_user_collection():
     """Dependency to get the 'users' collection."""
-    return db.get_collection("users")
+    return get_collection("users")
 
 @router.post("/", response_model=UserUidResponse, status_code=status.HTTP_201_CREATED, response_model_by_alias=False)
 async def create_user(
@@ -29,31 +32,31 @@ async def create_user(
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error creating user: {e}")
 
-@router.get("/", response_model=List[UserInDB], response_model_by_alias=False)
+@router.get("/", response_model=None, responses={200: {"model": List[UserInDB]}})
 async def read_all_users(
     collection = Depends(get_user_collection)
 ):
     """Retrieves all users."""
-    users_cursor = collection.find()
+    users_cursor = collection.find({}, USER_PROJECTION)
     users = await users_cursor.to_list(length=None)  # Fetch all users
-    return [UserInDB(**user) for user in users]
+    return documents_response(users, id_field="uid")
 
 @router.get("/{user_id}", response_model=UserInDB, response_model_by_alias=False)
 async def read_user_by_id(
-    user_id: str = Path(..., description="The BSON ObjectId of the user as a string"),
+    user_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the user as a string"),
     collection = Depends(get_user_collection)
 ):
     """Retrieves a specific user by ID."""
     validated_user_oid = validate_object_id_sync(user_id)
     user = await collection.find_one({"_id": validated_user_oid})
     if user:
-        return UserInDB(**user)
+        return UserInDB.model_construct(**user)
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found")
 
 @router.put("/{user_id}", response_model=UserInDB, response_model_by_alias=False)
 async def update_user(
     user_update: UserCreate,
-    user_id: str = Path(..., description="The BSON ObjectId of the user as a string"),
+    user_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the user as a string"),
     collection = Depends(get_user_collection)
 ):
     """Updates an existing user."""
@@ -63,18 +66,18 @@ async def update_user(
     if not user_dict:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided")
 
-    updated_user = await collection.find_one_and_update(
+    previous = await collection.find_one_and_update(
         {"_id": validated_user_oid},
         {"$set": user_dict},
-        return_document=ReturnDocument.AFTER
+        return_document=ReturnDocument.BEFORE
     )
-    if updated_user:
-        return UserInDB(**updated_user)
+    if previous:
+        return UserInDB.model_construct(**{**previous, **user_dict})
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found for update")
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
-    user_id: str = Path(..., description="The BSON ObjectId of the user as a string"),
+    user_id: str = Path(..., pattern=OBJECT_ID_PATTERN, description="The BSON ObjectId of the user as a string"),
     collection = Depends(get_user_collection)
 ):
     """Deletes a user."""
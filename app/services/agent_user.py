@@ -38,10 +38,9 @@ async def create_agent_user(agent_user_data: AgentUserCreate, db: AsyncIOMotorDa
     agent_user_dict = agent_user_data.model_dump()
     result = await db[COLLECTION_NAME].insert_one(agent_user_dict)
 
-    created_agent_user = await db[COLLECTION_NAME].find_one({"_id": result.inserted_id})
-    created_agent_user["id"] = str(created_agent_user["_id"])
-    
-    return AgentUserInDB.model_validate(created_agent_user)
+    # Echo the validated input with its new id instead of reading the document back
+    agent_user_dict.pop("_id", None)
+    return AgentUserInDB.model_construct(id=str(result.inserted_id), **agent_user_dict)
 
 
 async def get_agent_user_by_id(agent_user_id: str, db: AsyncIOMotorDatabase) -> Optional[AgentUserInDB]:
@@ -60,23 +59,12 @@ async def get_agent_user_by_uid(uid: str, db: AsyncIOMotorDatabase) -> Optional[
         return AgentUserInDB.model_validate(agent_user)
     return None
 
-async def get_all_agent_users(db: AsyncIOMotorDatabase):
+def find_all_agent_users(db: AsyncIOMotorDatabase, batch_size: int = 500, projection: Optional[dict] = None):
     """
-    Fetch all agent users from the MongoDB 'agent_users' collection.
-    Ensures each document has an 'id' field instead of '_id'.
+    Cursor over every agent user, fetched from MongoDB batch_size documents at a time.
+    Documents keep their raw _id; callers stream them rather than building a list.
     """
-    try:
-        cursor = db["agent_users"].find({})
-        users = await cursor.to_list(length=None)
-
-        for user in users:
-            user["id"] = str(user["_id"])
-            user.pop("_id", None)  # Remove _id to avoid Pydantic issues
-        return users
-
-    except Exception as e:
-        print(f"Error in get_all_agent_users: {e}")
-        raise
+    return db[COLLECTION_NAME].find({}, projection).batch_size(batch_size)
 
 
 async def update_agent_user(agent_user_id: str, agent_user_update_data: AgentUserUpdate, db: AsyncIOMotorDatabase) -> Optional[AgentUserInDB]:
@@ -135,6 +123,15 @@ async def get_agent_user_by_email(email: str, db: AsyncIOMotorDatabase) -> Optio
         return AgentUserInDB.model_validate(agent_user)
     return None
 
+async def get_agent_user_fields_by_email(email: str, fields: List[str], db: AsyncIOMotorDatabase) -> Optional[dict]:
+    """
+    Returns only the requested fields of the agent user with this email (no _id),
+    so the lookup is answered from the email index without building a model.
+    """
+    projection = {field: 1 for field in fields}
+    projection["_id"] = 0
+    return await db[COLLECTION_NAME].find_one({"email": email}, projection)
+
 async def get_agent_user_status_by_email(email: str, db: AsyncIOMotorDatabase) -> Optional[UserStatus]:
     """
     Retrieves the status of an agent user by their email.
@@ -222,8 +219,8 @@ def get_groq_api_key_sync(email: str, base_api_url: str) -> Tuple[bool, str]:
             logger.warning(f"User {email} is not allowed to use the service")
             return False, ""
             
-        # Now get the full user data to extract the API key
-        user_url = f"{base_api_url}/api/v1/agent_users/{email}"
+        # Now fetch just the API key
+        user_url = f"{base_api_url}/api/v1/agent_users/by-email/{email}/groq"
         user_response = requests.get(user_url, timeout=10)
         
         if user_response.status_code != 200:
@@ -231,7 +228,7 @@ def get_groq_api_key_sync(email: str, base_api_url: str) -> Tuple[bool, str]:
             return True, ""  # User is allowed but we couldn't get the API key
             
         user_data = user_response.json()
-        api_key = user_data.get("groq_api", "")
+        api_key = user_data.get("id") or ""
         
         if not api_key:
             logger.warning(f"No GROQ API key found for user {email}")
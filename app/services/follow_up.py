@@ -1,7 +1,6 @@
 # import os
 # import logging
-# import requests
-# from datetime import datetime, timezone
+# # from datetime import datetime, timezone
 # from dotenv import load_dotenv
 # from groq import Groq
 
@@ -233,11 +232,12 @@
 
 
 import os
+import re
+import textwrap
 import logging
-import requests
-from datetime import datetime, timezone
 from dotenv import load_dotenv
 from openai import OpenAI
+from app.services.message_history import fetch_message_history, HISTORY_WINDOW
 
 # Load environment variables
 load_dotenv()
@@ -251,43 +251,11 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
   # Replace with your actual API URL
 
-class QuestionAnalyzer:
-    def __init__(self):
-        self.client = client
-    
-    def get_message_history(self, uid):
-        """Retrieve the last 10 messages from the database for a specific user"""
-        try:
-            if not uid:
-                logger.error("UID is required to fetch message history.")
-                return []
-            response = requests.get(f"{BASE_API_URL}/api/v1/messages/", params={"uid": uid})
-            response.raise_for_status()
-            all_messages = response.json()
-            message_count = len(all_messages)
-            if message_count == 0:
-                logger.info(f"No messages found for uid={uid}")
-                return []
-            if message_count <= 10:
-                logger.info(f"Found {message_count} messages for uid={uid} (less than or equal to 10)")
-                return all_messages
-            else:
-                logger.info(f"Found {message_count} messages for uid={uid} — returning last 10")
-                return all_messages[-10:]
-        except Exception as e:
-            logger.error(f"Error fetching message history for uid={uid}: {e}")
-            return []
-    
-    def analyze_question_context(self, current_question, uid):
-        """
-        Analyze if the current question needs context from previous messages
-        Returns: dict with 'needs_context', 'analysis', and 'enhanced_question'
-        """
-        # Enhanced context check prompt with strict criteria and examples
-        context_check_prompt = f"""
+# Prompt templates are dedented once at import; only the question/history are filled in per call
+_CONTEXT_CHECK_PROMPT_TMPL = textwrap.dedent("""
         Analyze this question and determine if it ACTUALLY needs context from previous conversations to be understood and executed.
 
-        Question: "{current_question}"
+        Question: "{question}"
 
         A question NEEDS CONTEXT only if it contains:
         1. Unclear pronouns referring to previous items (it, this, that, them)
@@ -332,7 +300,103 @@ class QuestionAnalyzer:
         Be VERY strict - only return YES if the question is genuinely incomplete without previous context.
 
         Respond with only "YES" if it needs previous context, or "NO" if it's complete on its own.
+        """)
+
+_ENHANCE_PROMPT_TMPL = textwrap.dedent("""
+        Fill in missing information from recent conversation history:
+
+        RECENT CONVERSATION HISTORY:
+        {history}
+
+        CURRENT INCOMPLETE QUESTION: "{question}"
+
+        TASK: Add only the missing essential information (repo name, file name, project name) from the conversation history. Pay special attention to "push" commands that need repository names.
+        Instructions:
+        1. Identify what context is missing from the current question
+        2. Fill in missing information from the conversation history (repo names, file names, project details, etc.)
+        3. Return a complete, enhanced version of the question that includes all necessary context
+        4. If pushing code, include the repo name and suggest a filename if not mentioned
+        5. Make the question self-contained and clear
+        
+        Example:
+        - If history mentions "create repo augai" and current question is "write html signup page and push"
+        - Enhanced: "write html code for signup page, save as signup.html and push to augai repository"
+        
+        EXAMPLES:
+        History: "User: create repo myapp" → "Bot: Repository created"
+        Current: "push code"
+        Enhanced: "push code to myapp repo"
+
+        History: "User: proceed with creating GitHub repository named us" → "Bot: Repository created"
+        Current: "now create a 1 mobile shop website page frontend in html and CSS for selling mobile and push it"
+        Output like : now create a 1 mobile shop website page frontend in html and CSS for selling mobile in sellingmobile.html and push it to us repository"
+        Important:
+        history: "User: create a Jira project called Landing Site" → "Bot: Project created"
+        current: "Add an issue: Add responsive footer with high priority."
+        output like: "Add an issue: Add responsive footer with high priority in the jira project named Landing Site."
+
+        IMPORTANT: If the question mentions "push" or "push it" without specifying a repository, always add the repository name from history.
+        """)
+
+# Words that suggest the question leans on earlier messages; without any of
+# these, and with no recent history, the LLM check is skipped
+_CONTEXT_HINTS = re.compile(
+    r"\b(it|its|this|that|these|those|them|there|same|again|continue|"
+    r"the (repo|repository|branch|project|file|code|page|issue|site|website)|"
+    r"push|pull|merge|deploy|issue|priority)\b",
+    re.I
+)
+
+def _compact_history(history, max_msgs=6, max_chars=512, include_replies=True):
+    """
+    Turn raw message history into short prompt lines: consecutive duplicate
+    requests are dropped, each text is cut to max_chars and only the last
+    max_msgs requests are kept.
+    """
+    turns = []
+    last_content = None
+    for msg in history:
+        content = (msg.get('content') or msg.get('text') or '').strip()
+        if not content or content == last_content:
+            continue
+        last_content = content
+        reply = (msg.get('reply') or '').strip() if include_replies else ''
+        turns.append((content[:max_chars], reply[:max_chars]))
+
+    lines = []
+    for count, (content, reply) in enumerate(turns[-max_msgs:], 1):
+        lines.append(f"User request {count}: {content}")
+        if reply:
+            lines.append(f"Bot reply {count}: {reply}")
+    return lines
+
+class QuestionAnalyzer:
+    def __init__(self):
+        self.client = client
+        self.history_window = HISTORY_WINDOW
+    
+    def get_message_history(self, uid, limit=10):
+        """Retrieve the last `limit` messages within the history window for a specific user"""
+        return fetch_message_history(uid, "content,reply", limit, self.history_window)
+    
+    def analyze_question_context(self, current_question, uid):
+        """
+        Analyze if the current question needs context from previous messages
+        Returns: dict with 'needs_context', 'analysis', and 'enhanced_question'
         """
+        # Skip both LLM calls when nothing in the question points back and there is
+        # no recent history it could point back to
+        message_history = None
+        if not _CONTEXT_HINTS.search(current_question or ""):
+            message_history = self.get_message_history(uid)
+            if not message_history:
+                return {
+                    'needs_context': False,
+                    'analysis': 'Question is complete and self-contained',
+                    'enhanced_question': current_question
+                }
+
+        context_check_prompt = _CONTEXT_CHECK_PROMPT_TMPL.format(question=current_question)
         
         try:
             response = self.client.chat.completions.create(
@@ -355,13 +419,15 @@ class QuestionAnalyzer:
             }
         
         # If context is needed, get message history and enhance the question
-        return self.enhance_question_with_context(current_question, uid)
+        return self.enhance_question_with_context(current_question, uid, message_history)
 
-    def enhance_question_with_context(self, current_question, uid):
+    def enhance_question_with_context(self, current_question, uid, message_history=None):
         """
-        Enhance the current question with context from previous messages
+        Enhance the current question with context from previous messages;
+        message_history is fetched unless the caller already has it
         """
-        message_history = self.get_message_history(uid)
+        if message_history is None:
+            message_history = self.get_message_history(uid)
         
         if not message_history:
             return {
@@ -370,25 +436,8 @@ class QuestionAnalyzer:
                 'enhanced_question': current_question
             }
         
-        # Format history for context - only include user questions, skip replies
-        history_text = ""
-        count = 0
-        for msg in message_history:
-            content = msg.get('content', msg.get('text', ''))
-            reply = msg.get('reply', '')
-            
-            if content and content.strip():
-                count += 1
-                history_text += f"User request {count}: {content.strip()}\n"
-                
-                # Add bot reply if available
-                if reply and reply.strip():
-                    history_text += f"Bot reply {count}: {reply.strip()}\n"
-                
-                history_text += "\n"  # Add spacing between conversations
-                
-                if count >= 10:  # Limit to last 10 user requests
-                    break
+        # Format history for context - trimmed, deduped and capped to keep the prompt small
+        history_text = "\n".join(_compact_history(message_history))
         
         if not history_text.strip():
             return {
@@ -397,41 +446,7 @@ class QuestionAnalyzer:
                 'enhanced_question': current_question
             }
         
-        enhancement_prompt = f"""
-        Fill in missing information from recent conversation history:
-
-        RECENT CONVERSATION HISTORY:
-        {history_text}
-
-        CURRENT INCOMPLETE QUESTION: "{current_question}"
-
-        TASK: Add only the missing essential information (repo name, file name, project name) from the conversation history. Pay special attention to "push" commands that need repository names.
-        Instructions:
-        1. Identify what context is missing from the current question
-        2. Fill in missing information from the conversation history (repo names, file names, project details, etc.)
-        3. Return a complete, enhanced version of the question that includes all necessary context
-        4. If pushing code, include the repo name and suggest a filename if not mentioned
-        5. Make the question self-contained and clear
-        
-        Example:
-        - If history mentions "create repo augai" and current question is "write html signup page and push"
-        - Enhanced: "write html code for signup page, save as signup.html and push to augai repository"
-        
-        EXAMPLES:
-        History: "User: create repo myapp" → "Bot: Repository created"
-        Current: "push code"
-        Enhanced: "push code to myapp repo"
-
-        History: "User: proceed with creating GitHub repository named us" → "Bot: Repository created"
-        Current: "now create a 1 mobile shop website page frontend in html and CSS for selling mobile and push it"
-        Output like : now create a 1 mobile shop website page frontend in html and CSS for selling mobile in sellingmobile.html and push it to us repository"
-        Important:
-        history: "User: create a Jira project called Landing Site" → "Bot: Project created"
-        current: "Add an issue: Add responsive footer with high priority."
-        output like: "Add an issue: Add responsive footer with high priority in the jira project named Landing Site."
-
-        IMPORTANT: If the question mentions "push" or "push it" without specifying a repository, always add the repository name from history.
-        """
+        enhancement_prompt = _ENHANCE_PROMPT_TMPL.format(history=history_text, question=current_question)
         
         try:
             response = self.client.chat.completions.create(
@@ -479,6 +494,9 @@ class QuestionAnalyzer:
         return result['enhanced_question']
 
 # Standalone function for easy import and use
+# Shared analyzer so the history cache survives between calls
+_analyzer = QuestionAnalyzer()
+
 def analyze_and_enhance_question(question, uid, base_api_url=None):
     """
     Standalone function to analyze and enhance a question with context
@@ -495,8 +513,7 @@ def analyze_and_enhance_question(question, uid, base_api_url=None):
     if base_api_url:
         BASE_API_URL = base_api_url
     
-    analyzer = QuestionAnalyzer()
-    return analyzer.process_question(question, uid)
+    return _analyzer.process_question(question, uid)
 
 # # Usage example
 # def main():
@@ -1,14 +1,24 @@
 import os
+import textwrap
 import logging
 import requests
-from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from groq import Groq
+import pybreaker
+from app.utils.timestamps import now_iso
+from app.services.message_history import fetch_message_history, HISTORY_WINDOW
 
 # Load environment variables
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")  # Keep as fallback
 BASE_API_URL = os.getenv("BASE_API_URL")
+CHAT_MODEL = os.getenv("GROQ_CHAT_MODEL", "llama-3.3-70b-versatile")
+
+# One pooled session for the key lookups and reply writes, so they reuse keep-alive connections
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
 # Configure logging
 logging.basicConfig(
@@ -20,10 +30,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger("GenericBot")
 
+# Static system prompt, dedented once at import so every request sends the same minimal prefix
+_RESPONSE_SYSTEM_PROMPT = textwrap.dedent("""
+            You are a helpful assistant responding to messages from various users on different channels (like Slack or Email). 
+            When generating replies, be polite and refer to previous messages if needed. Use the user's name if available.
+
+            If a user asks what you can do or requests a summary of your capabilities, respond clearly and concisely by listing the main functions you perform, such as:
+
+            - Creating, cloning, and managing GitHub repositories and branches.
+            - Committing, pushing, updating, and generating code in repositories.
+            - Handling GitHub issues, including creating, commenting, labeling, assigning, and managing their status.
+            - Managing pull requests, releases, and repository backups.
+            - Working with Jira projects and issues: creating, updating, commenting, assigning, and organizing tasks.
+            - Synchronizing branches, creating workflows, and archiving/unarchiving repositories.
+            - Generating code and applying natural language instructions to update code.
+            - Performing repository maintenance tasks such as renaming, duplicating, restoring, and deleting repositories.
+
+            Always aim to tailor your response to the user's context. If the user’s question is vague or incomplete, politely ask for clarification or additional details before proceeding.
+
+            Example response when asked "What can you do?":
+
+            "Hi [User's Name], I can help you manage your GitHub repositories and Jira projects. This includes creating and cloning repositories, managing branches, handling issues and pull requests, generating and updating code, and much more. If you want, I can provide a detailed list or help you with a specific task—just let me know!"
+            Example response when asked "Hi, How are you?", "How can you help me?", or similar greetings:
+            "Hi [User's Name], I'm here to assist you with your coding and project management tasks. How can I help you today?"
+            Example response when asked "What specific tasks can you perform related to coding?":
+            "Hi [User's Name], regarding coding, I can generate new code based on your prompts, modify and update existing code in your repositories, and commit those changes for you. Whether you need help writing new features, fixing bugs, or improving your codebase, I'm here to assist!"
+            This approach ensures clear, polite, and context-aware communication.
+
+            """).strip()
+
+# Fail fast with the fallback reply while Groq keeps erroring or timing out
+_groq_breaker = pybreaker.CircuitBreaker(fail_max=5, reset_timeout=30)
+
 # Don't initialize client globally, we'll do it per request
 def get_groq_api_key(sender_email):
     try:
-        response = requests.get(f"{BASE_API_URL}/api/v1/agent_users/groq/{sender_email}", timeout=10)
+        response = _session.get(f"{BASE_API_URL}/api/v1/agent_users/by-email/{sender_email}/groq", timeout=10)
 
         if response.status_code == 200:
             data = response.json()
@@ -44,6 +86,7 @@ def get_groq_api_key(sender_email):
 class GenericMessageHandler:
     def __init__(self):
         self.clients = {}  # Cache for Groq clients
+        self.history_window = HISTORY_WINDOW
 
     def get_groq_client(self, username):
         """Get a Groq client for the username, with fallback to environment variable"""
@@ -85,31 +128,8 @@ class GenericMessageHandler:
     #         logger.error(f"Error fetching message history: {e}")
     #         return []
 
-    def get_message_history(self, uid):
-        try:
-            if not uid:
-                logger.error("UID is required to fetch message history.")
-                return []
-
-            response = requests.get(f"{BASE_API_URL}/api/v1/messages/", params={"uid": uid})
-            response.raise_for_status()
-            all_messages = response.json()
-
-            message_count = len(all_messages)
-
-            if message_count == 0:
-                logger.info(f"No messages found for uid={uid}")
-                return []
-
-            if message_count <= 10:
-                logger.info(f"Found {message_count} messages for uid={uid} (less than or equal to 10)")
-                return all_messages
-            else:
-                logger.info(f"Found {message_count} messages for uid={uid} — returning last 10")
-                return all_messages[-10:]
-        except Exception as e:
-            logger.error(f"Error fetching message history for uid={uid}: {e}")
-            return []
+    def get_message_history(self, uid, limit=10):
+        return fetch_message_history(uid, "content,reply,username,message_datetime,channel", limit, self.history_window)
 
 
     def generate_llm_response(self, message_content, message_history):
@@ -124,35 +144,8 @@ class GenericMessageHandler:
             if not client:
                 return "I'm sorry, I couldn't process your request due to configuration issues."
                 
-            system_prompt = """
-            You are a helpful assistant responding to messages from various users on different channels (like Slack or Email). 
-            When generating replies, be polite and refer to previous messages if needed. Use the user's name if available.
 
-            If a user asks what you can do or requests a summary of your capabilities, respond clearly and concisely by listing the main functions you perform, such as:
-
-            - Creating, cloning, and managing GitHub repositories and branches.
-            - Committing, pushing, updating, and generating code in repositories.
-            - Handling GitHub issues, including creating, commenting, labeling, assigning, and managing their status.
-            - Managing pull requests, releases, and repository backups.
-            - Working with Jira projects and issues: creating, updating, commenting, assigning, and organizing tasks.
-            - Synchronizing branches, creating workflows, and archiving/unarchiving repositories.
-            - Generating code and applying natural language instructions to update code.
-            - Performing repository maintenance tasks such as renaming, duplicating, restoring, and deleting repositories.
-
-            Always aim to tailor your response to the user's context. If the user’s question is vague or incomplete, politely ask for clarification or additional details before proceeding.
-
-            Example response when asked "What can you do?":
-
-            "Hi [User's Name], I can help you manage your GitHub repositories and Jira projects. This includes creating and cloning repositories, managing branches, handling issues and pull requests, generating and updating code, and much more. If you want, I can provide a detailed list or help you with a specific task—just let me know!"
-            Example response when asked "Hi, How are you?", "How can you help me?", or similar greetings:
-            "Hi [User's Name], I'm here to assist you with your coding and project management tasks. How can I help you today?"
-           Example response when asked "What specific tasks can you perform related to coding?":
-            "Hi [User's Name], regarding coding, I can generate new code based on your prompts, modify and update existing code in your repositories, and commit those changes for you. Whether you need help writing new features, fixing bugs, or improving your codebase, I'm here to assist!"
-            This approach ensures clear, polite, and context-aware communication.
-
-            """
-
-            formatted_messages = [{"role": "system", "content": system_prompt}]
+            formatted_messages = [{"role": "system", "content": _RESPONSE_SYSTEM_PROMPT}]
 
             for msg in message_history:
                 username = msg.get("username", "User")
@@ -165,13 +158,17 @@ class GenericMessageHandler:
                 if msg.get("reply") and msg["reply"] not in [None, "", "null"]:
                     formatted_messages.append({"role": "assistant", "content": msg["reply"]})
 
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
+            response = _groq_breaker.call(
+                client.chat.completions.create,
+                model=CHAT_MODEL,
                 messages=formatted_messages,
                 temperature=0.7,
                 max_completion_tokens=200
             )
             return response.choices[0].message.content.strip()
+        except pybreaker.CircuitBreakerError:
+            logger.warning("Groq circuit open, returning fallback reply")
+            return "Hi there! How can I help you today?"
         except Exception as e:
             logger.error(f"LLM generation failed: {e}")
             return "Hi there! How can I help you today?"
@@ -185,7 +182,7 @@ class GenericMessageHandler:
                 "processed": True,
                 "status": "processed",
                 "username": original_message.get("username", ""),
-                "message_datetime": original_message.get("message_datetime", datetime.now(timezone.utc).isoformat()),
+                "message_datetime": original_message.get("message_datetime") or now_iso(),
                 "sid": original_message.get("sid", ""),
                 "uid": original_message.get("uid", ""),
                 "pid": original_message.get("pid", ""),
@@ -195,8 +192,9 @@ class GenericMessageHandler:
                 "thread_ts": original_message.get("thread_ts", "")
             }
 
-            response = requests.put(f"{BASE_API_URL}/api/v1/messages/{mid}", json=payload)
-            if response.status_code == 200:
+            # Only success matters here, so ask for a 204 instead of the updated document
+            response = _session.put(f"{BASE_API_URL}/api/v1/messages/{mid}", json=payload, headers={"Prefer": "return=minimal"})
+            if response.status_code in (200, 204):
                 logger.info(f"Updated message {mid} with reply")
                 return True
             else:
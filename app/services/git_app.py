@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from groq import Groq
+import pybreaker
 import json
 import sys
 import re
@@ -47,9 +48,15 @@ from .github_functions import (
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")  # Keep as fallback
 BASE_API_URL = os.getenv("BASE_API_URL")
+# Function routing and parameter extraction are short classification/JSON tasks,
+# so they run on the small model (chat replies use GROQ_CHAT_MODEL in generic_bot)
+EXTRACT_MODEL = os.getenv("GROQ_EXTRACT_MODEL", "llama-3.1-8b-instant")
 
 # Don't initialize client globally
 
+# Fail fast while Groq keeps erroring or timing out; callers already treat errors as "no result"
+_groq_breaker = pybreaker.CircuitBreaker(fail_max=5, reset_timeout=30)
+
 # Dictionary to cache Groq clients by email
 groq_clients = {}
 
@@ -156,7 +163,7 @@ param_requirements = {
 
 def identify_function(query, email="service@codsy.ai"):
     """
-    Use Groq with Llama 3.3 Versatile to identify the most appropriate GitHub function
+    Use Groq (EXTRACT_MODEL) to identify the most appropriate GitHub function
     based on the user query.
     """
     client = get_groq_client(email)
@@ -178,8 +185,9 @@ def identify_function(query, email="service@codsy.ai"):
         """
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        response = _groq_breaker.call(
+            client.chat.completions.create,
+            model=EXTRACT_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.5,
             max_completion_tokens=100
@@ -207,7 +215,7 @@ def identify_function(query, email="service@codsy.ai"):
 
 def extract_parameters(func_name, query, email="service@codsy.ai"):
     """
-    Use Groq with Llama 3.3 Versatile to extract parameters from the user query
+    Use Groq (EXTRACT_MODEL) to extract parameters from the user query
     based on the function name.
     """
     client = get_groq_client(email)
@@ -245,33 +253,85 @@ def extract_parameters(func_name, query, email="service@codsy.ai"):
         """
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        stream = _groq_breaker.call(
+            client.chat.completions.create,
+            model=EXTRACT_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
-            max_completion_tokens=400
+            max_completion_tokens=400,
+            stream=True
         )
-        
-        result = response.choices[0].message.content
-        
-        # Extract JSON from response
-        json_match = re.search(r'```json\s*(.*?)\s*```', result, re.DOTALL)
-        if json_match:
-            result = json_match.group(1)
-        else:
-            # Try to find anything that looks like JSON
-            json_match = re.search(r'(\{.*\})', result, re.DOTALL)
-            if json_match:
-                result = json_match.group(1)
-        
-        # Parse JSON
-        parsed = json.loads(result)
-        return parsed
+
+        # Stop reading the stream as soon as the first JSON object is complete
+        parsed = _read_json_stream(stream)
+        if parsed is not None:
+            return parsed
+        print("Error extracting parameters: no JSON object in response")
+        return {}
 
     except Exception as e:
         print(f"Error extracting parameters: {e}")
         return {}
 
+def _read_json_stream(stream):
+    """
+    Accumulate streamed completion chunks and return the first JSON object
+    once its braces balance, closing the stream early. Falls back to parsing
+    the full buffered text if no balanced object parses on the way.
+    """
+    parts = []
+    depth = 0
+    start = None
+    in_string = False
+    escaped = False
+    offset = 0
+
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            parts.append(delta)
+
+            for i, ch in enumerate(delta, offset):
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif ch == "\\":
+                        escaped = True
+                    elif ch == '"':
+                        in_string = False
+                elif ch == '"' and start is not None:
+                    in_string = True
+                elif ch == "{":
+                    if start is None:
+                        start = i
+                    depth += 1
+                elif ch == "}" and start is not None:
+                    depth -= 1
+                    if depth == 0:
+                        text = "".join(parts)
+                        try:
+                            return json.loads(text[start:i + 1])
+                        except ValueError:
+                            start = None
+            offset += len(delta)
+    finally:
+        try:
+            stream.close()
+        except Exception:
+            pass
+
+    # Stream ended without a balanced object; use the old regex extraction
+    result = "".join(parts)
+    json_match = re.search(r'```json\s*(.*?)\s*```', result, re.DOTALL) or re.search(r'(\{.*\})', result, re.DOTALL)
+    if json_match:
+        result = json_match.group(1)
+    try:
+        return json.loads(result)
+    except ValueError:
+        return None
+
 def process_query(query, email="service@codsy.ai"):
     """
     Process a natural language query by:
@@ -0,0 +1,64 @@
+import os
+import logging
+import threading
+import requests
+import orjson
+from cachetools import TTLCache
+from datetime import datetime, timezone, timedelta
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+BASE_API_URL = os.getenv("BASE_API_URL")
+
+logger = logging.getLogger(__name__)
+
+# Look back this far for context
+HISTORY_WINDOW = timedelta(hours=48)
+
+# History fetches reuse pooled keep-alive connections to the backend instead of a new one per call
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# (uid, limit, fields) -> (etag, messages); TTLCache is not thread-safe
+_history_cache = TTLCache(maxsize=512, ttl=600)
+_history_lock = threading.Lock()
+
+def fetch_message_history(uid, fields, limit=10, window=HISTORY_WINDOW):
+    """
+    Return the user's last `limit` messages within `window`, oldest first, with only
+    `fields` (comma-separated). The API filters, sorts and caps the history; a 304
+    against the last ETag seen for this user reuses the cached list. [] on any error.
+    """
+    if not uid:
+        logger.error("UID is required to fetch message history.")
+        return []
+    params = {
+        "uid": uid,
+        "limit": limit,
+        "since": (datetime.now(timezone.utc) - window).isoformat(),
+        "order": "desc",
+        "fields": fields,
+    }
+    cache_key = (uid, limit, fields)
+    with _history_lock:
+        cached = _history_cache.get(cache_key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    try:
+        response = _session.get(f"{BASE_API_URL}/api/v1/messages/", params=params, headers=headers, timeout=(3, 10))
+        if response.status_code == 304 and cached:
+            messages = cached[1]
+        else:
+            response.raise_for_status()
+            messages = orjson.loads(response.content)
+            etag = response.headers.get("ETag")
+            if etag:
+                with _history_lock:
+                    _history_cache[cache_key] = (etag, messages)
+    except Exception as e:
+        logger.error(f"Error fetching message history for uid={uid}: {e}")
+        return []
+    logger.info(f"Found {len(messages)} messages for uid={uid}")
+    # Newest first from the API; callers expect chronological order
+    return list(reversed(messages))
@@ -167,7 +167,7 @@ def update_message_status(mid, original_msg):
     try:
         original_msg["processed"] = True
         original_msg["status"] = "processed"
-        response = requests.put(f"{BASE_API_URL}/api/v1/messages/{mid}", json=original_msg)
+        response = requests.put(f"{BASE_API_URL}/api/v1/messages/{mid}", json=original_msg, headers={"Prefer": "return=minimal"})
         response.raise_for_status()
         logger.info(f"Updated message {mid} to processed")
     except Exception as e:
@@ -187,7 +187,7 @@ def update_message_with_reply(mid, reply):
             message_data["reply"] = reply
             message_data["completion_date"] = datetime.now(timezone.utc).isoformat()
 
-            update_response = requests.put(url, json=message_data)
+            update_response = requests.put(url, json=message_data, headers={"Prefer": "return=minimal"})
             update_response.raise_for_status()
             logger.info(f"Message {mid} updated with reply")
             return True
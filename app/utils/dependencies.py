@@ -1,7 +1,19 @@
+import re
 from bson import ObjectId
-from bson.errors import InvalidId
+from functools import lru_cache
 from fastapi import Path, HTTPException, status
 
+# 24 hex characters; used as a Path pattern so malformed ids are rejected during parameter parsing
+OBJECT_ID_PATTERN = r"^[0-9a-fA-F]{24}$"
+# Same check for ids that arrive in bodies or query strings; fullmatch so a trailing newline fails too
+_is_object_id = re.compile(r"[0-9a-fA-F]{24}").fullmatch
+
+@lru_cache(maxsize=4096)
+def _to_oid(id_str: str) -> ObjectId:
+    """Parses an ObjectId string, reusing the result for ids seen recently."""
+    # Already checked against the regex, so skip ObjectId's own string validation
+    return ObjectId(bytes.fromhex(id_str))
+
 def validate_object_id_sync(id_str: str) -> ObjectId:
     """
     Helper function to convert an ID string to a BSON ObjectId.
@@ -12,18 +24,13 @@ def validate_object_id_sync(id_str: str) -> ObjectId:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="ID must be a non-empty string"
         )
-    try:
-        return ObjectId(id_str)
-    except InvalidId:
+    # Reject malformed ids with the regex instead of letting ObjectId() raise
+    if not _is_object_id(id_str):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid ObjectId format: {id_str}"
         )
-    except Exception as e: # Catch other potential errors during conversion
-         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error converting ID: {e}"
-        )
+    return _to_oid(id_str)
 
 async def validate_object_id(id_str: str = Path(..., description="MongoDB ObjectId as a string")) -> ObjectId:
     """
@@ -0,0 +1,39 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket keyed by an arbitrary value (e.g. a Slack channel).
+    Each key refills at `rate` tokens per second up to `capacity`.
+    """
+
+    def __init__(self, rate: float = 1.0, capacity: int = 1, max_keys: int = 1024):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> (tokens, last_refill)
+        self._lock = threading.Lock()
+
+    def _reserve(self, key) -> float:
+        """Take a token for key and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            tokens -= 1
+            if key not in self._buckets and len(self._buckets) >= self.max_keys:
+                # Drop the oldest key; an idle bucket is full anyway
+                self._buckets.pop(next(iter(self._buckets)))
+            self._buckets[key] = (tokens, now)
+            return 0.0 if tokens >= 0 else -tokens / self.rate
+
+    def acquire(self, key) -> None:
+        """Block until a token is available for key."""
+        wait = self._reserve(key)
+        if wait > 0:
+            time.sleep(wait)
+
+
+# Slack allows roughly one chat.postMessage per second per channel
+slack_post_limiter = TokenBucket(rate=1.0, capacity=1)
@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi import Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+
+def _default(obj: Any) -> Any:
+    """orjson fallback for types it can't serialize natively (datetime is native)."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type {type(obj).__name__} is not JSON serializable")
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse that also understands raw MongoDB documents (ObjectId values),
+    so handlers returning find() results directly don't go through stdlib json.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def documents_response(docs: List[dict], id_field: Optional[str] = None) -> MongoJSONResponse:
+    """
+    Send Mongo documents straight to the client, skipping response-model validation.
+    `_id` is renamed to id_field, matching what response_model_by_alias=False would emit.
+    """
+    if id_field:
+        for doc in docs:
+            doc[id_field] = doc.pop("_id")
+    return MongoJSONResponse(content=docs)
+
+
+def document_etag(oid: Any, updated_at: Optional[datetime]) -> str:
+    """Weak ETag from a document's _id and last update time; documents never updated get version 0."""
+    # Mongo hands back naive UTC datetimes
+    version = int(updated_at.replace(tzinfo=timezone.utc).timestamp() * 1000) if updated_at else 0
+    return f'W/"{oid}-{version}"'
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Tags a response so clients cache it but revalidate with If-None-Match before reuse."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    If-None-Match check (RFC 9110): `*` matches any existing representation, otherwise
+    any listed tag matches by weak comparison, so W/"x" and "x" are the same tag.
+    """
+    if not if_none_match or etag is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    """304 for a conditional GET whose If-None-Match still matches."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def prefers_minimal(prefer: Optional[str]) -> bool:
+    """True when the request's Prefer header (RFC 7240) asks for return=minimal."""
+    return bool(prefer) and any(p.strip().lower() == "return=minimal" for p in prefer.split(","))
+
+
+def _encode(doc: dict, id_field: Optional[str]) -> bytes:
+    if id_field:
+        doc[id_field] = doc.pop("_id")
+    return orjson.dumps(doc, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+async def _json_array(cursor, id_field: Optional[str], first: Optional[dict]):
+    """Encode documents one at a time as they arrive from the cursor, as a JSON array."""
+    if first is None:
+        yield b"[]"
+        return
+    yield b"[" + _encode(first, id_field)
+    async for doc in cursor:
+        yield b"," + _encode(doc, id_field)
+    yield b"]"
+
+
+async def stream_documents(cursor, id_field: Optional[str] = None) -> StreamingResponse:
+    """
+    Like documents_response, but streams a Motor cursor so memory stays bounded by
+    the cursor's batch size instead of the collection size. The first batch is fetched
+    before the response starts, so a failing query is still answered with a 500
+    instead of a 200 that breaks off mid-body.
+    """
+    try:
+        first = await cursor.next()
+    except StopAsyncIteration:
+        first = None
+    return StreamingResponse(_json_array(cursor, id_field, first), media_type="application/json")
@@ -0,0 +1,6 @@
+from datetime import datetime, timezone
+
+
+def now_iso() -> str:
+    """Current UTC time as an ISO 8601 string (timezone-aware, "+00:00" offset)."""
+    return datetime.now(timezone.utc).isoformat()